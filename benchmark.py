@@ -0,0 +1,26 @@
+import argparse
+import os
+from datetime import datetime
+from classes.benchmark import Benchmark
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the conversion of a synthetic zero results workbook")
+    parser.add_argument("--rows", type=int, default=5000, help="number of rows in the source workbook")
+    parser.add_argument("--headings", type=int, default=1000, help="number of headings in the codes file")
+    parser.add_argument("--typos", type=int, default=100, help="number of entries in the typos file")
+    parser.add_argument("--workers", type=int, default=1, help="number of worker processes used to format messages")
+    parser.add_argument("--no-spell-check", action="store_true", help="do not suggest corrections for misspelt terms")
+    parser.add_argument("--trace-memory", action="store_true", help="record the peak Python memory of each stage")
+    parser.add_argument("--output", help="file to save the results to")
+    args = parser.parse_args()
+
+    output = args.output
+    if output is None:
+        date_string = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        output = os.path.join(os.getcwd(), "resources", "benchmark", "benchmark_" + date_string + ".json")
+
+    benchmark = Benchmark(args.rows, args.headings, args.typos, args.workers, args.trace_memory, not args.no_spell_check)
+    results = benchmark.run()
+    benchmark.save(results, output)
+    print(f'{results["rows_per_second"]} rows per second')
@@ -0,0 +1,17 @@
+import argparse
+import os
+import sys
+from classes.golden_check import GoldenCheck
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the formatting of a fixed set of messages against the recorded results")
+    parser.add_argument("--folder", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden"), help="folder of cases.json and typos.csv")
+    parser.add_argument("--update", action="store_true", help="record the current results as the expected ones")
+    args = parser.parse_args()
+
+    golden_check = GoldenCheck(args.folder)
+    if args.update:
+        golden_check.update()
+    elif golden_check.run():
+        sys.exit(1)
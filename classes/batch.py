@@ -0,0 +1,79 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from classes.excel import Excel
+
+reference_data = None
+
+
+def initialise_worker(data):
+    global reference_data
+    reference_data = data
+
+
+def convert_source(source):
+    # Sources are already converted in parallel, so each one is formatted in a single process
+    excel = Excel(source, reference_data)
+    excel.workers = 1
+    return convert(excel)
+
+
+def convert(excel):
+    outputs = excel.outputs
+    excel.outputs = [output for output in outputs if output != "log"]
+    excel.convert()
+    excel.outputs = outputs
+    return excel.get_log(), excel.rule_profile.totals
+
+
+class Batch(object):
+    def __init__(self, manifest_file_path, workers=None):
+        load_dotenv('.env')
+        with open(manifest_file_path) as f:
+            manifest = json.load(f)
+        self.sources = [self.get_source(entry) for entry in manifest]
+        self.workers = workers if workers is not None else min(len(self.sources), os.cpu_count() or 1)
+
+        # Loads the codes, country failures and typos once, for every source
+        self.excel = Excel(self.sources[0])
+        self.reference_data = self.excel.get_reference_data()
+
+    def get_source(self, entry):
+        # Each source names its workbook, and its outputs are named after it unless given
+        name = entry["name"]
+        return {
+            "name": name,
+            "source_file": entry["source_file"],
+            "sheet_name": entry.get("sheet_name", os.getenv("SHEET_NAME")),
+            "yaml_file": entry.get("yaml_file", name + ".yml"),
+            "yaml_file_temp": entry.get("yaml_file_temp", os.path.join("resources", "yml", name + "_prototype.yml")),
+            "excel_output": entry.get("excel_output", name + "_{date}.xlsx")
+        }
+
+    def run(self):
+        print(f'Converting {len(self.sources)} sources')
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=initialise_worker, initargs=(self.reference_data,)) as executor:
+                results = list(executor.map(convert_source, self.sources))
+        else:
+            results = [convert(Excel(source, self.reference_data)) for source in self.sources]
+
+        if "log" in self.excel.outputs:
+            self.write_log([log for log, rule_profile in results])
+            # A single rule profile for the batch, with the counts of every source
+            if self.excel.profile_rules:
+                for log, rule_profile in results:
+                    self.excel.rule_profile.merge(rule_profile)
+                self.excel.write_rule_profile()
+        print("Complete")
+
+    def write_log(self, logs):
+        # A single log for the batch, with the diagnostics of each source under its name
+        my_json = {
+            "success_count": sum(log["success_count"] for log in logs),
+            "sources": {source["name"]: log for source, log in zip(self.sources, logs)}
+        }
+        out_file = open(self.excel.log_file_path, "w")
+        json.dump(my_json, out_file, indent=6)
+        out_file.close()
@@ -0,0 +1,124 @@
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from classes.synthetic_data import SyntheticData
+from classes.excel import Excel
+
+
+class Benchmark(object):
+    def __init__(self, rows, headings, typos, workers=1, trace_memory=False, spell_check=True):
+        self.rows = rows
+        self.headings = headings
+        self.typos = typos
+        self.workers = workers
+        self.spell_check = spell_check
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.format_steps = {}
+
+    def run(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as folder:
+            print(f'Generating {self.rows} synthetic rows')
+            data = SyntheticData(folder, self.rows, self.headings, self.typos)
+            data.generate()
+            os.environ.update(data.get_environment())
+            os.environ["WORKERS"] = str(self.workers)
+            os.environ["MESSAGE_CACHE"] = "0"
+            os.environ["STREAMING"] = "0"
+            os.environ["TIMINGS"] = "1"
+            # The settings that change what the stages do are set, so that runs can be compared
+            os.environ["SPELL_CHECK"] = "1" if self.spell_check else "0"
+            os.environ["REFERENCE_SNAPSHOT"] = "0"
+            os.environ["INCREMENTAL_OUTPUT"] = "0"
+            os.environ["RULE_PROFILE"] = "0"
+            os.environ["OUTPUTS"] = "yaml,yaml_for_prototype,excel,log"
+            os.chdir(folder)
+            try:
+                self.run_stages()
+            finally:
+                os.chdir(cwd)
+
+        return self.get_results()
+
+    def run_stages(self):
+        if self.trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+
+        excel = self.time_stage("load_reference_data", Excel)
+        jobs = self.time_stage("read", lambda: list(excel.iter_jobs()))
+        self.job_count = len(jobs)
+        intercept_messages = self.time_stage("format", lambda: list(excel.format_jobs(iter(jobs))))
+        for intercept_message in intercept_messages:
+            excel.diagnostics.merge(intercept_message.diagnostics)
+            excel.timings.add_message(intercept_message)
+            if intercept_message.is_valid:
+                excel.intercept_messages.append(intercept_message)
+        # The writers run at the same time, as in a conversion
+        self.time_stage("write", excel.write)
+
+        self.total_seconds = time.perf_counter() - start
+        self.message_count = len(excel.intercept_messages)
+        self.format_steps = excel.timings.as_dict()["steps"]
+        if self.trace_memory:
+            tracemalloc.stop()
+
+    def time_stage(self, name, function):
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        result = function()
+        stage = {"seconds": round(time.perf_counter() - start, 4)}
+        if self.trace_memory:
+            stage["peak_memory_mb"] = round(tracemalloc.get_traced_memory()[1] / 1048576, 2)
+        self.stages[name] = stage
+        print(f'{name}: {stage["seconds"]}s')
+        return result
+
+    def get_results(self):
+        format_seconds = self.stages["format"]["seconds"]
+        return {
+            "date": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": {
+                "rows": self.rows,
+                "headings": self.headings,
+                "typos": self.typos,
+                "workers": self.workers,
+                "spell_check": self.spell_check
+            },
+            "jobs": self.job_count,
+            "messages": self.message_count,
+            "total_seconds": round(self.total_seconds, 4),
+            "rows_per_second": round(self.rows / self.total_seconds, 1),
+            "messages_formatted_per_second": round(self.job_count / format_seconds, 1) if format_seconds else None,
+            "peak_rss_mb": self.get_peak_rss("RUSAGE_SELF"),
+            "peak_rss_workers_mb": self.get_peak_rss("RUSAGE_CHILDREN") if self.workers > 1 else None,
+            "stages": self.stages,
+            "format_steps": self.format_steps
+        }
+
+    def get_peak_rss(self, who):
+        # The peak of this process, or of the largest worker process once they have exited
+        try:
+            import resource
+        except ImportError:
+            return None
+        peak = resource.getrusage(getattr(resource, who)).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+        if sys.platform == "darwin":
+            return round(peak / 1048576, 2)
+        return round(peak / 1024, 2)
+
+    def save(self, results, filename):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        with open(filename, "w") as f:
+            json.dump(results, f, indent=6)
+        print(f'Results saved to {filename}')
@@ -0,0 +1,60 @@
+import re
+
+digits_pattern = re.compile("[0-9]+")
+
+# Text that joins the codes in a list, e.g. 8471/8473 or 8471, 8473 or 8474
+list_separators = ["/", " / ", ", ", ",", " or ", ", or "]
+
+
+class CodeReference(object):
+    __slots__ = ["start", "end", "digits", "length", "prefix", "next_character", "group", "separator"]
+
+    def __init__(self, message, start, end):
+        self.start = start
+        self.end = end
+        self.digits = message[start:end]
+        self.length = end - start
+        # The text just before the code, which is long enough to hold " subheading "
+        self.prefix = message[max(0, start - 12):start]
+        self.next_character = message[end:end + 1]
+        self.group = 0
+        self.separator = None
+
+    def is_bounded(self):
+        # True where the digits have a non-digit on both sides
+        return self.start > 0 and self.next_character != ""
+
+    def follows(self, text, ignore_case=False):
+        if ignore_case:
+            return self.prefix.casefold().endswith(text)
+        return self.prefix.endswith(text)
+
+
+def tokenize(message):
+    # Splits a message into text and code reference tokens in a single pass. Codes that are
+    # only separated by a list separator share a group
+    tokens = []
+    position = 0
+    group = 0
+    previous = None
+    for match in digits_pattern.finditer(message):
+        start, end = match.span()
+        text = message[position:start]
+        if text != "":
+            tokens.append(text)
+        reference = CodeReference(message, start, end)
+        if previous is not None and text in list_separators:
+            reference.separator = text
+        else:
+            group += 1
+        reference.group = group
+        tokens.append(reference)
+        previous = reference
+        position = end
+    if position < len(message):
+        tokens.append(message[position:])
+    return tokens
+
+
+def get_code_references(tokens):
+    return [token for token in tokens if isinstance(token, CodeReference)]
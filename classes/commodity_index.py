@@ -0,0 +1,49 @@
+class CommodityIndex(object):
+    def __init__(self):
+        self.entities = {}
+        self.prefixes = {}
+
+    def __contains__(self, code):
+        return code in self.entities
+
+    def __len__(self):
+        return len(self.entities)
+
+    def add(self, code, entity):
+        self.entities[code] = entity
+        significant = self.significant_digits(code)
+        for length in (2, 4, 6, 8):
+            if length <= len(significant):
+                self.prefixes.setdefault(code[:length], []).append(code)
+
+    def entity_type(self, code):
+        return self.entities.get(code)
+
+    def is_valid_ancestor(self, code):
+        # True where a 4, 6 or 8-digit code leads to at least one code in the tariff
+        return len(code) in (4, 6, 8) and code in self.prefixes
+
+    def descendants(self, code):
+        code = self.significant_digits(code)
+        if len(code) == 10:
+            return []
+        return [descendant for descendant in self.prefixes.get(code, []) if self.significant_digits(descendant) != code]
+
+    def children(self, code):
+        code = code.ljust(10, "0")
+        return [descendant for descendant in self.descendants(code) if self.parent(descendant) == code]
+
+    def parent(self, code):
+        significant = self.significant_digits(code)
+        while len(significant) > 2:
+            significant = significant[:-2]
+            ancestor = significant.ljust(10, "0")
+            if ancestor in self.entities:
+                return ancestor
+        return None
+
+    def significant_digits(self, code):
+        code = code.ljust(10, "0")
+        while len(code) > 2 and code.endswith("00"):
+            code = code[:-2]
+        return code
@@ -0,0 +1,18 @@
+class Diagnostics(object):
+    def __init__(self):
+        self.erroneous_digits = []
+        self.incorrect_commodities = []
+        self.useless_messages = []
+        self.typos = []
+
+    def merge(self, other):
+        self.erroneous_digits += other.erroneous_digits
+        self.incorrect_commodities += other.incorrect_commodities
+        self.useless_messages += other.useless_messages
+        self.typos += other.typos
+
+    def copy_for_term(self, term):
+        diagnostics = Diagnostics()
+        for name, entries in self.__dict__.items():
+            setattr(diagnostics, name, [{term: value} for entry in entries for value in entry.values()])
+        return diagnostics
@@ -1,23 +1,52 @@
-import openpyxl
-import xlsxwriter
 import os
 import json
 import sys
 import csv
+import collections
+import heapq
+import tempfile
+from contextlib import ExitStack, contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from datetime import datetime
-from classes.intercept_message import InterceptMessage
+from classes.intercept_message import render_yaml, render_yaml_for_prototype, get_rule_sets
+from classes.typo_corrector import TypoCorrector
+from classes.commodity_index import CommodityIndex
+from classes.diagnostics import Diagnostics
+from classes.message_store import MessageStore
+from classes.message_compiler import MessageCompiler
+from classes.spelling_suggester import SpellingSuggester
+from classes.reference_snapshot import ReferenceSnapshot
+from classes.incremental_output import AtomicOutput, IncrementalOutput
+from classes.source_readers import get_source_reader, parse_count
+from classes.lookup_index import write_lookup_index
+from classes import message_pool
+from classes import message_cache
+from classes.timings import Timings, timed_phase
+from classes.rule_profile import RuleProfile
 import classes.globals as g
 
 
 class Excel(object):
-    def __init__(self):
+    # Number of formatted rows held in memory at a time when sorting a streamed run
+    sort_chunk_size = 10000
+
+    def __init__(self, source=None, reference_data=None):
         load_dotenv('.env')
-        self.intercept_messages = []
+        self.intercept_messages = MessageStore()
+        self.is_sorted = False
+        self.success_count = None
+        self.diagnostics = Diagnostics()
+        self.timings = Timings()
+        self.rule_profile = RuleProfile()
         self.get_config()
-        self.load_codes()
-        self.get_country_failures()
+        self.set_source(source if source is not None else self.get_source())
+        if reference_data is None:
+            self.load_reference_data()
+        else:
+            self.set_reference_data(reference_data)
 
+    @timed_phase
     def get_config(self):
         # Features - sort results
         try:
@@ -25,6 +54,71 @@ class Excel(object):
         except Exception as e:
             self.sort_results = 0
 
+        # Features - stream rows from the source file straight to the outputs
+        try:
+            self.streaming = int(os.getenv('STREAMING')) == 1
+        except Exception as e:
+            self.streaming = False
+
+        # Features - cache formatted messages between runs
+        try:
+            self.use_cache = int(os.getenv('MESSAGE_CACHE')) == 1
+        except Exception as e:
+            self.use_cache = True
+
+        try:
+            self.cache_size = int(os.getenv('MESSAGE_CACHE_SIZE'))
+        except Exception as e:
+            self.cache_size = 100000
+
+        # Features - keep a snapshot of the parsed reference data between runs
+        try:
+            self.use_snapshot = int(os.getenv('REFERENCE_SNAPSHOT')) == 1
+        except Exception as e:
+            self.use_snapshot = True
+
+        # Features - only rewrite the YAML files when they change, and write a change set
+        try:
+            self.incremental_output = int(os.getenv('INCREMENTAL_OUTPUT')) == 1
+        except Exception as e:
+            self.incremental_output = False
+
+        # Features - record how long each stage and formatting step takes
+        try:
+            self.record_timings = int(os.getenv('TIMINGS')) == 1
+        except Exception as e:
+            self.record_timings = False
+
+        try:
+            self.timings.slowest_count = int(os.getenv('TIMINGS_SLOWEST'))
+        except Exception as e:
+            self.timings.slowest_count = 10
+
+        # Features - count how often each typo and rewrite rule matches and what it costs
+        try:
+            self.profile_rules = int(os.getenv('RULE_PROFILE')) == 1
+        except Exception as e:
+            self.profile_rules = False
+
+        # Features - outputs to write
+        try:
+            tmp = os.getenv('OUTPUTS')
+            self.outputs = [output.strip() for output in tmp.split(",")]
+        except Exception as e:
+            self.outputs = ["yaml", "yaml_for_prototype", "excel", "log"]
+
+        # Features - suggest corrections for misspelt search terms
+        try:
+            self.spell_check = int(os.getenv('SPELL_CHECK')) == 1
+        except Exception as e:
+            self.spell_check = True
+
+        # Features - number of worker processes used to format messages
+        try:
+            self.workers = int(os.getenv('WORKERS'))
+        except Exception as e:
+            self.workers = 1
+
         # Features - statuses to include
         try:
             tmp = os.getenv('STATUSES_TO_INCLUDE')
@@ -32,29 +126,10 @@ class Excel(object):
         except Exception as e:
             self.statuses_to_include = ["ready"]
 
-        # Get Excel file for input
-        self.source_file = os.getenv('SOURCE_FILE')
         self.resource_path = os.path.join(os.getcwd(), "resources")
         self.source_path = os.path.join(self.resource_path, "source")
-        self.source_file_path = os.path.join(self.source_path, self.source_file)
-
-        # Get YAML file for output
-        self.yaml_file = os.getenv('YAML_FILE')
         self.yaml_path = os.path.join(self.resource_path, "yml")
-        self.yaml_file_path = os.path.join(self.yaml_path, self.yaml_file)
-
-        # Get YAML file for output
-        self.yaml_file_temp = os.getenv('YAML_FILE_TEMP')
-
-        # Get Excel output file file
-        self.excel_output_file = os.getenv('EXCEL_OUTPUT')
-        now = datetime.now()
-        date_string = now.strftime("%Y-%m-%d_%H-%M")
-        date_string = now.strftime("%Y-%m-%d")
-
-        self.excel_output_file = self.excel_output_file.replace("{date}", date_string)
         self.excel_path = os.path.join(self.resource_path, "excel")
-        self.excel_output_file_path = os.path.join(self.excel_path, self.excel_output_file)
 
         # Get typos file
         self.typos_file = os.getenv('TYPOS_FILE')
@@ -65,106 +140,425 @@ class Excel(object):
         self.typos_file = os.getenv('TYPOS_FILE')
         self.log_path = os.path.join(self.resource_path, "log")
         self.log_file_path = os.path.join(self.log_path, "log.json")
+        self.rule_profile_file_path = os.path.join(self.log_path, "rule_profile.json")
+
+        # Get cache of formatted messages
+        self.cache_file_path = os.path.join(self.resource_path, "cache", "messages.db")
+
+        # Get snapshot of the reference data
+        self.snapshot_file_path = os.path.join(self.resource_path, "cache", "reference.pickle")
 
         # For checking of codes exist
         self.codes_file = os.getenv('CODES_FILE')
 
+        # Get countries that have no trade page
+        self.country_failures_file_path = os.path.join(self.config_path, "country_failures.json")
+
+    def get_source(self):
+        # The source sheet and its outputs, as given in the .env file
+        return {
+            "source_file": os.getenv('SOURCE_FILE'),
+            "sheet_name": os.getenv('SHEET_NAME'),
+            "yaml_file": os.getenv('YAML_FILE'),
+            "yaml_file_temp": os.getenv('YAML_FILE_TEMP'),
+            "excel_output": os.getenv('EXCEL_OUTPUT')
+        }
+
+    def set_source(self, source):
+        # Get Excel file for input
+        self.source_file = source["source_file"]
+        self.source_file_path = os.path.join(self.source_path, self.source_file)
+
         # Get sheet name
-        self.sheet_name = os.getenv('SHEET_NAME')
+        self.sheet_name = source["sheet_name"]
+
+        # Get YAML file for output
+        self.yaml_file = source["yaml_file"]
+        self.yaml_file_path = os.path.join(self.yaml_path, self.yaml_file)
+        self.change_set_file_path = os.path.splitext(self.yaml_file_path)[0] + "_changes.json"
+
+        # Get lookup index for output
+        self.lookup_file_path = os.path.splitext(self.yaml_file_path)[0] + ".lookup"
+
+        # Get YAML file for output
+        self.yaml_file_temp = source["yaml_file_temp"]
+
+        # Get Excel output file file
+        self.excel_output_file = source["excel_output"]
+        now = datetime.now()
+        date_string = now.strftime("%Y-%m-%d_%H-%M")
+        date_string = now.strftime("%Y-%m-%d")
+
+        self.excel_output_file = self.excel_output_file.replace("{date}", date_string)
+        self.excel_output_file_path = os.path.join(self.excel_path, self.excel_output_file)
+
+    def get_reference_data(self):
+        # The codes, country failures and typos, so that they can be loaded once and
+        # shared by the Excel objects for several sources
+        return {
+            "commodities": g.commodities,
+            "country_failures": g.country_failures,
+            "typo_corrector": self.typo_corrector,
+            "vocabulary": self.vocabulary
+        }
 
+    def set_reference_data(self, reference_data):
+        g.commodities = reference_data["commodities"]
+        g.country_failures = reference_data["country_failures"]
+        self.typo_corrector = reference_data["typo_corrector"]
+        # The vocabulary of the commodity descriptions is shared by every source, and only
+        # read. The genuine terms of this source are added to a suggester laid over it
+        self.vocabulary = reference_data["vocabulary"] if self.spell_check else None
+        self.spelling_suggester = self.vocabulary.overlay() if self.vocabulary is not None else None
+
+    def load_reference_data(self):
+        # The reference data is read from the snapshot, unless one of its files has changed
+        snapshot = ReferenceSnapshot(self.snapshot_file_path, self.get_reference_files(), f'spell_check={self.spell_check}')
+        if self.use_snapshot and self.load_snapshot(snapshot):
+            return
+
+        self.vocabulary = SpellingSuggester() if self.spell_check else None
+        self.load_codes()
+        self.get_country_failures()
+        self.load_typos()
+        reference_data = self.get_reference_data()
+        if self.use_snapshot:
+            snapshot.save(reference_data)
+        self.set_reference_data(reference_data)
+
+    def get_reference_files(self):
+        return [self.codes_file, self.country_failures_file_path, self.typos_file_path]
+
+    @timed_phase
+    def load_snapshot(self, snapshot):
+        reference_data = snapshot.load()
+        if reference_data is None:
+            return False
+        self.set_reference_data(reference_data)
+        print("Reference data has been read from the snapshot.")
+        return True
+
+    @timed_phase
     def load_codes(self):
-        g.commodities = []
+        # The codes are only made visible once they have all been read, as the preview
+        # formats messages while the reference data is reloaded
+        commodities = CommodityIndex()
         with open(self.codes_file) as csv_file:
             csv_reader = csv.reader(csv_file, delimiter=',')
             line_count = 0
+            description_index = 7
             for row in csv_reader:
                 if line_count > 0:
                     pls = row[2]
                     if pls == "80":
-                        g.commodities.append(row[1])
-                        g.commodities_dict[row[1]] = row[8]
+                        commodities.add(row[1], row[8])
+                    if self.vocabulary is not None:
+                        self.vocabulary.add_text(row[description_index])
+                else:
+                    headers = [header.strip().lower() for header in row]
+                    if "description" in headers:
+                        description_index = headers.index("description")
                 line_count += 1
 
+        g.commodities = commodities
         print(f'{line_count} commodity codes have been read.')
 
+    @timed_phase
     def get_country_failures(self):
-        filename = os.path.join(self.config_path, "country_failures.json")
-        f = open(filename)
+        f = open(self.country_failures_file_path)
         g.country_failures = json.load(f)
 
+    @timed_phase
+    def load_typos(self):
+        self.typo_corrector = TypoCorrector(self.typos_file_path)
+
+    @timed_phase
     def read(self):
         print("Reading source Excel file")
-        workbook = openpyxl.load_workbook(self.source_file_path)
-        sheet = workbook[self.sheet_name]
+        for intercept_message in self.format_messages():
+            self.diagnostics.merge(intercept_message.diagnostics)
+            if self.record_timings:
+                self.timings.add_message(intercept_message)
+            if self.profile_rules:
+                self.rule_profile.add_message(intercept_message)
+            if intercept_message.is_valid:
+                self.intercept_messages.append(intercept_message)
+
+        self.is_sorted = False
+        print("Complete")
+
+    def convert(self):
+        if self.streaming:
+            self.stream()
+        else:
+            self.read()
+            self.write()
+
+    def write(self):
+        writers = {
+            "yaml": self.write_yaml,
+            "yaml_for_prototype": self.write_yaml_for_prototype,
+            "excel": self.write_excel,
+            "lookup": self.write_lookup_index
+        }
+        # The writers only read the finished messages, so they run at the same time once
+        # the messages have been sorted
+        self.sort_the_results()
+        with ThreadPoolExecutor(max_workers=len(writers)) as executor:
+            futures = [executor.submit(writer) for output, writer in writers.items() if output in self.outputs]
+            for future in futures:
+                future.result()
+
+        # The log includes the timings, so is written once every other output has finished
+        if "log" in self.outputs:
+            self.write_erroneous_digits()
+
+    @timed_phase
+    def stream(self):
+        # Formats each row as it is read and writes it straight to the outputs, so
+        # that memory use does not grow with the size of the source sheet
+        print("Streaming source Excel file")
+        records = self.iter_records()
+        if self.sort_results == 1:
+            records = self.external_sort(records)
+
+        # The outputs replace the previous files when every row has been written, and are
+        # removed if a row fails
+        with ExitStack() as stack:
+            yaml_file = stack.enter_context(self.open_output(self.yaml_file_path, self.change_set_file_path)) if "yaml" in self.outputs else None
+            yaml_file_temp = stack.enter_context(self.open_output(self.yaml_file_temp)) if "yaml_for_prototype" in self.outputs else None
+            sheet = None
+            if "excel" in self.outputs:
+                sheet, format_wrap = stack.enter_context(self.open_excel_output())
+            # The lookup index is sorted by term as it is written, so its records are kept
+            lookup_records = [] if "lookup" in self.outputs else None
+
+            success_count = 0
+            for term, message in records:
+                success_count += 1
+                if yaml_file is not None:
+                    yaml_file.write(render_yaml(term, message))
+                if yaml_file_temp is not None:
+                    yaml_file_temp.write(render_yaml_for_prototype(term, message))
+                if sheet is not None:
+                    sheet.write(success_count, 0, term, format_wrap)
+                    sheet.write(success_count, 1, message, format_wrap)
+                if lookup_records is not None:
+                    lookup_records.append((term, message))
+        if lookup_records is not None:
+            self.write_lookup_index(lookup_records)
+        self.success_count = success_count
+        if "log" in self.outputs:
+            self.write_erroneous_digits(success_count)
+        print("Complete")
+
+    def iter_records(self):
+        for intercept_message in self.format_messages():
+            self.diagnostics.merge(intercept_message.diagnostics)
+            if self.record_timings:
+                self.timings.add_message(intercept_message)
+            if self.profile_rules:
+                self.rule_profile.add_message(intercept_message)
+            if intercept_message.is_valid:
+                yield (intercept_message.term, intercept_message.message)
+
+    def external_sort(self, records):
+        # Sorts by term in chunks that are spilled to temporary files, then merges the chunks
+        print("Sorting")
+        chunk_files = []
+        chunk = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= self.sort_chunk_size:
+                chunk_files.append(self.spill_chunk(chunk))
+                chunk = []
+        if chunk:
+            chunk_files.append(self.spill_chunk(chunk))
+
+        chunks = [self.read_chunk(chunk_file) for chunk_file in chunk_files]
+        for record in heapq.merge(*chunks, key=lambda x: x[0]):
+            yield record
+
+        for chunk_file in chunk_files:
+            chunk_file.close()
+
+    def spill_chunk(self, chunk):
+        chunk.sort(key=lambda x: x[0])
+        chunk_file = tempfile.TemporaryFile(mode="w+")
+        for record in chunk:
+            chunk_file.write(json.dumps(record) + "\n")
+        chunk_file.seek(0)
+        return chunk_file
+
+    def read_chunk(self, chunk_file):
+        for line in chunk_file:
+            yield tuple(json.loads(line))
+
+    def format_messages(self):
+        jobs = self.timings.timed_iter("read_source", self.iter_jobs())
+        # Cached messages are not formatted, so would leave no step timings or rule counts
+        if self.use_cache and not self.record_timings and not self.profile_rules:
+            return self.format_messages_with_cache(jobs)
+        else:
+            return self.format_jobs(jobs)
+
+    def format_jobs(self, jobs):
+        if self.workers > 1:
+            return message_pool.format_messages(jobs, self.workers, self.typo_corrector, self.record_timings, self.profile_rules)
+        else:
+            compiler = MessageCompiler(self.typo_corrector, self.record_timings, self.profile_rules)
+            return (compiler.format(term, message) for term, message in jobs)
+
+    def format_messages_with_cache(self, jobs):
+        # Only jobs missing from the cache are formatted. Jobs are queued in source order
+        # as they are looked up, so cached and newly formatted messages can be interleaved
+        fingerprint = message_cache.get_fingerprint(self.typos_file_path, self.codes_file, g.country_failures)
+        cache = message_cache.MessageCache(self.cache_file_path, self.cache_size, fingerprint)
+        pending = collections.deque()
+
+        def misses():
+            for term, message in jobs:
+                cached_message = cache.get(term, message)
+                pending.append((term, message, cached_message))
+                if cached_message is None:
+                    yield (term, message)
+
+        for intercept_message in self.format_jobs(misses()):
+            term, message, cached_message = pending.popleft()
+            while cached_message is not None:
+                yield cached_message
+                term, message, cached_message = pending.popleft()
+            cache.put(term, message, intercept_message)
+            yield intercept_message
+
+        while pending:
+            yield pending.popleft()[2]
+
+        cache.close()
+
+    def iter_jobs(self):
+        # Yields the term and message pairs to be formatted, in the order they appear
+        rows = self.iter_rows()
+        if self.vocabulary is not None:
+            rows = self.build_spelling_suggester(rows)
+        for term, message, genuine_term in rows:
+            if self.spelling_suggester is not None:
+                self.check_spelling(term, message)
+            yield (term, message)
+            if genuine_term != "":
+                terms = genuine_term.split(",")
+                for i in range(0, len(terms)):
+                    terms[i] = terms[i].strip()
+                terms = list(set(terms))
+                for term2 in terms:
+                    term2 = term2.strip()
+                    if term2 != "" and term2 != term:
+                        yield (term2, message)
+
+    def iter_rows(self):
+        # Yields the term, message and genuine terms of each row that is included
+        reader = get_source_reader(self.source_file_path, self.sheet_name, self.streaming)
         row_index = 0
-        for row in sheet.iter_rows():
+        for row in reader.iter_rows():
             row_index += 1
             if row_index > 1:
                 # print(row_index)
-                term = row[0].internal_value
-                total_events = row[1].internal_value
-                message = row[6].internal_value
-                status = row[7].internal_value
-                genuine_term = row[8].internal_value
-
-                if "COUNTRY" not in message:
-                    term = str(term).strip().lower() if term is not None else ""
-                else:
-                    term = str(term).strip() if term is not None else ""
-                total_events = int(total_events) if total_events is not None else 0
+                term = row[0]
+                total_events = row[1]
+                message = row[6]
+                status = row[7]
+                genuine_term = row[8]
+
+                term = normalise_term(term, message)
+                total_events = parse_count(total_events)
                 message = str(message).strip() if message is not None else ""
                 status = str(status).strip().lower() if status is not None else ""
                 genuine_term = str(genuine_term).strip().lower() if genuine_term is not None else ""
 
                 if status in self.statuses_to_include and message != "":
-                    intercept_message = InterceptMessage(term, message, self.typos_file_path)
-                    if intercept_message.is_valid:
-                        self.intercept_messages.append(intercept_message)
-                    if genuine_term != "":
-                        terms = genuine_term.split(",")
-                        for i in range(0, len(terms)):
-                            terms[i] = terms[i].strip()
-                        terms = list(set(terms))
-                        for term2 in terms:
-                            term2 = term2.strip()
-                            if term2 != "" and term2 != term:
-                                intercept_message = InterceptMessage(term2, message, self.typos_file_path)
-                                if intercept_message.is_valid:
-                                    self.intercept_messages.append(intercept_message)
-
-        print("Complete")
-
+                    yield (term, message, genuine_term)
+
+    def build_spelling_suggester(self, rows):
+        # The genuine terms have been checked by an editor, so the genuine terms of every row
+        # are added to the vocabulary before any term is checked. When streaming, the source
+        # is read twice, rather than holding its rows
+        self.spelling_suggester = self.vocabulary.overlay()
+        if not self.streaming:
+            rows = list(rows)
+        for term, message, genuine_term in rows:
+            self.spelling_suggester.add_text(genuine_term)
+        return rows if not self.streaming else self.iter_rows()
+
+    def check_spelling(self, term, message):
+        if "COUNTRY" not in message:
+            suggestion = self.spelling_suggester.suggest_term(term)
+            if suggestion is not None:
+                obj = {
+                    term: suggestion
+                }
+                self.diagnostics.typos.append(obj)
+
+    @timed_phase
     def write_yaml(self):
-        if self.sort_results == 1:
-            self.sort_the_results()
-        # s = "en:\n"
-        s = ""
-        for intercept_message in self.intercept_messages:
-            if intercept_message.yaml != "":
-                s += intercept_message.yaml
-
-        f = open(self.yaml_file_path, "w")
-        f.write(s)
-        f.close()
+        self.sort_the_results()
+        with self.open_output(self.yaml_file_path, self.change_set_file_path) as f:
+            for term, message in self.intercept_messages:
+                f.write(render_yaml(term, message))
 
+    @timed_phase
     def write_yaml_for_prototype(self):
-        if self.sort_results == 1:
-            self.sort_the_results()
-        s = ""
-        for intercept_message in self.intercept_messages:
-            if intercept_message.yaml != "":
-                s += intercept_message.yaml_for_prototype
+        self.sort_the_results()
+        with self.open_output(self.yaml_file_temp) as f:
+            for term, message in self.intercept_messages:
+                f.write(render_yaml_for_prototype(term, message))
 
-        f = open(self.yaml_file_temp, "w")
-        f.write(s)
-        f.close()
+    @timed_phase
+    def write_lookup_index(self, records=None):
+        self.sort_the_results()
+        write_lookup_index(self.lookup_file_path, records if records is not None else self.intercept_messages)
+
+    def open_output(self, file_path, change_set_file_path=None):
+        if self.incremental_output:
+            return IncrementalOutput(file_path, change_set_file_path)
+        return AtomicOutput(file_path)
 
     def sort_the_results(self):
-        print("Sorting")
-        self.intercept_messages = sorted(self.intercept_messages, key=lambda x: x.term, reverse=False)
+        # The messages are sorted once, however many of the writers are run
+        if self.sort_results == 1 and not self.is_sorted:
+            print("Sorting")
+            self.intercept_messages.sort()
+            self.is_sorted = True
 
+    @timed_phase
     def write_excel(self):
-        workbook = xlsxwriter.Workbook(self.excel_output_file_path)
+        self.sort_the_results()
+        with self.open_excel_output() as (sheet, format_wrap):
+            row_index = 0
+            for term, message in self.intercept_messages:
+                row_index += 1
+                sheet.write(row_index, 0, term, format_wrap)
+                sheet.write(row_index, 1, message, format_wrap)
+
+    @contextmanager
+    def open_excel_output(self):
+        # Rows are written in order, so each one can be flushed to disk as it is written. The
+        # workbook is written to a temporary file in the same folder, which replaces the
+        # previous workbook once every row has been written
+        temp_file_path = f'{self.excel_output_file_path}.{os.getpid()}.tmp'
+        workbook, sheet, format_wrap = self.create_excel_workbook(temp_file_path, {'constant_memory': True})
+        try:
+            yield sheet, format_wrap
+        except BaseException:
+            # Closing the workbook removes the files that hold its rows
+            workbook.close()
+            os.remove(temp_file_path)
+            raise
+        workbook.close()
+        os.replace(temp_file_path, self.excel_output_file_path)
+
+    def create_excel_workbook(self, file_path, options=None):
+        import xlsxwriter
+        workbook = xlsxwriter.Workbook(file_path, options)
 
         format_bold = workbook.add_format({'bold': True})
         format_bold.set_align('top')
@@ -181,25 +575,41 @@ class Excel(object):
             sheet.set_column(i, i, widths[i])
         sheet.write(0, 0, "Term", format_bold)
         sheet.write(0, 1, "Message", format_bold)
-
-        row_index = 0
-        for intercept_message in self.intercept_messages:
-            row_index += 1
-            if intercept_message.yaml != "":
-                sheet.write(row_index, 0, intercept_message.term, format_wrap)
-                sheet.write(row_index, 1, intercept_message.message, format_wrap)
-
         sheet.freeze_panes(1, 0)
-        workbook.close()
 
-    def write_erroneous_digits(self):
-        my_json = {
-            "success_count": len(self.intercept_messages),
-            "erroneous_digits": g.erroneous_digits,
-            "incorrect_commodities": g.incorrect_commodities,
-            "useless_messages": g.useless_messages,
-            "typos": g.typos
-        }
+        return workbook, sheet, format_wrap
+
+    def write_erroneous_digits(self, success_count=None):
+        my_json = self.get_log(success_count)
         out_file = open(self.log_file_path, "w")
         json.dump(my_json, out_file, indent=6)
         out_file.close()
+        if self.profile_rules:
+            self.write_rule_profile()
+
+    def write_rule_profile(self):
+        my_json = self.rule_profile.as_dict(get_rule_sets(self.typo_corrector))
+        out_file = open(self.rule_profile_file_path, "w")
+        json.dump(my_json, out_file, indent=6)
+        out_file.close()
+
+    def get_log(self, success_count=None):
+        if success_count is None:
+            success_count = self.success_count if self.success_count is not None else len(self.intercept_messages)
+        my_json = {
+            "success_count": success_count,
+            "erroneous_digits": self.diagnostics.erroneous_digits,
+            "incorrect_commodities": self.diagnostics.incorrect_commodities,
+            "useless_messages": self.diagnostics.useless_messages,
+            "typos": self.diagnostics.typos
+        }
+        if self.record_timings:
+            my_json["timings"] = self.timings.as_dict()
+        return my_json
+
+
+def normalise_term(term, message):
+    # Terms are lower case, except those of country messages, which are country names
+    if "COUNTRY" not in message:
+        return str(term).strip().lower() if term is not None else ""
+    return str(term).strip() if term is not None else ""
@@ -1,10 +1,7 @@
-erroneous_digits = []
-incorrect_commodities = []
-useless_messages = []
-commodities = []
-commodities_dict = {}
+from classes.commodity_index import CommodityIndex
+
+commodities = CommodityIndex()
 country_failures = []
-typos = []
 
 
 def decapitalise(s):
@@ -0,0 +1,61 @@
+import json
+import os
+from classes.commodity_index import CommodityIndex
+from classes.intercept_message import InterceptMessage
+from classes.message_compiler import MessageCompiler
+from classes.typo_corrector import TypoCorrector
+import classes.globals as g
+
+
+class GoldenCheck(object):
+    # Formats a fixed set of messages and compares them with the recorded results. Each
+    # message is formatted in full, through the compiler with its aliases, as the
+    # conversion does, and one rule at a time, as when profiling, so the three must agree
+    def __init__(self, folder):
+        self.cases_file_path = os.path.join(folder, "cases.json")
+        self.typos_file_path = os.path.join(folder, "typos.csv")
+        with open(self.cases_file_path) as f:
+            self.golden = json.load(f)
+
+        commodities = CommodityIndex()
+        for code, entity in self.golden["commodities"].items():
+            commodities.add(code, entity)
+        g.commodities = commodities
+        g.country_failures = self.golden["country_failures"]
+        self.typo_corrector = TypoCorrector(self.typos_file_path)
+
+    def run(self):
+        compiler = MessageCompiler(self.typo_corrector)
+        failures = 0
+        for case in self.golden["cases"]:
+            for term in [case["term"]] + case["aliases"]:
+                expected = case.get("expected", {}).get(term)
+                results = {
+                    "full": self.get_result(InterceptMessage(term, case["message"], self.typo_corrector)),
+                    "compiled": self.get_result(compiler.format(term, case["message"])),
+                    "profiled": self.get_result(InterceptMessage(term, case["message"], self.typo_corrector, profile_rules=True))
+                }
+                for path, result in results.items():
+                    if result != expected:
+                        failures += 1
+                        print(f'{term} ({path}): expected {json.dumps(expected)}, got {json.dumps(result)}')
+
+        print(f'{failures} golden messages differ from the recorded results.')
+        return failures
+
+    def update(self):
+        for case in self.golden["cases"]:
+            case["expected"] = {}
+            for term in [case["term"]] + case["aliases"]:
+                case["expected"][term] = self.get_result(InterceptMessage(term, case["message"], self.typo_corrector))
+
+        with open(self.cases_file_path, "w") as f:
+            json.dump(self.golden, f, indent=6)
+        print(f'The results of {len(self.golden["cases"])} golden messages have been recorded.')
+
+    def get_result(self, intercept_message):
+        return {
+            "message": intercept_message.message,
+            "is_valid": intercept_message.is_valid,
+            "diagnostics": intercept_message.diagnostics.__dict__
+        }
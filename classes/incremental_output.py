@@ -0,0 +1,78 @@
+import filecmp
+import json
+import os
+
+
+class AtomicOutput(object):
+    # Writes a file through a temporary file in the same folder, which replaces the file
+    # once it has been written. If the run fails, the previous file is left in place
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.temp_file_path = f'{file_path}.{os.getpid()}.tmp'
+        self.file = open(self.temp_file_path, "w")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+            os.remove(self.temp_file_path)
+
+    def write(self, s):
+        self.file.write(s)
+
+    def close(self):
+        self.file.close()
+        os.replace(self.temp_file_path, self.file_path)
+
+
+class IncrementalOutput(AtomicOutput):
+    # Only replaces the file if its contents have changed. A change set of the terms that
+    # were added, removed or modified can be written alongside it
+    def __init__(self, file_path, change_set_file_path=None):
+        AtomicOutput.__init__(self, file_path)
+        self.change_set_file_path = change_set_file_path
+        self.changed = None
+
+    def close(self):
+        self.file.close()
+        self.changed = not os.path.exists(self.file_path) or not filecmp.cmp(self.temp_file_path, self.file_path, shallow=False)
+        if self.change_set_file_path is not None:
+            self.write_change_set()
+        if self.changed:
+            os.replace(self.temp_file_path, self.file_path)
+        else:
+            os.remove(self.temp_file_path)
+            print(f'{os.path.basename(self.file_path)} is unchanged, so has not been rewritten.')
+
+    def write_change_set(self):
+        change_set = {"added": {}, "removed": [], "modified": {}}
+        if self.changed:
+            previous = read_yaml_records(self.file_path) if os.path.exists(self.file_path) else {}
+            for term, message in read_yaml_records(self.temp_file_path).items():
+                if term not in previous:
+                    change_set["added"][term] = message
+                elif previous.pop(term) != message:
+                    change_set["modified"][term] = message
+            change_set["removed"] = sorted(previous)
+
+        temp_file_path = f'{self.change_set_file_path}.{os.getpid()}.tmp'
+        with open(temp_file_path, "w") as f:
+            json.dump(change_set, f, indent=6)
+        os.replace(temp_file_path, self.change_set_file_path)
+
+
+def read_yaml_records(file_path):
+    # Each record is term: "message", over one or more lines. Double quotes are replaced in
+    # the messages, so a record ends at the first quote that is followed by a new line.
+    # Where a term appears more than once, the last message is the one that is used
+    records = {}
+    with open(file_path) as f:
+        text = f.read()
+    for record in text.split('"\n')[:-1]:
+        term, message = record.rsplit(': "', 1)
+        records[term] = message
+    return records
@@ -1,50 +1,143 @@
-import requests
-import csv
 import sys
 import re
-from pluralizer import Pluralizer
+import time
+from classes.diagnostics import Diagnostics
+from classes.rewrite_rules import standardise_shorthand_rules, final_message_tidy_rules
+from classes import code_tokenizer
+from classes import rule_profile
 import classes.globals as g
 
+pluralizer = None
+
+whitespace_pattern = re.compile("\\s+")
+section_pattern = re.compile("section [A-Z]{1,2}[A-Z]", re.IGNORECASE)
+
+# Lists of headings in HMRC shorthand, e.g. 8471/8473/8474, joined into readable text
+hmrc_shortcuts = [(re.compile("([^0-9][0-9]{4}), ([0-9]{4}[^0-9])"), "\\1/\\2")]
+for i in range(8, -1, -1):
+    to_find = "([^0-9][0-9]{4})/" + ("([0-9]{4})/" * i) + "([0-9]{4}[^0-9])"
+    to_replace = "\\1"
+    for j in range(0, i):
+        to_replace += ", \\" + str(j + 2)
+    to_replace += " or heading \\" + str(i + 2)
+    hmrc_shortcuts.append((re.compile(to_find), to_replace))
+
+
+def is_spaced(reference):
+    return reference.start > 1 and reference.follows(" ") and reference.next_character != ""
+
+
+# Expressions that standardise the word before a code, each with a test for a code
+# reference that it could match, so that it only runs where it could make a change
+standardise_headings_rules = [
+    # Go easy where the terms commodity, heading or subheading have been omitted
+    (lambda x: x.length == 10 and is_spaced(x), re.compile("([^ye]) ([0-9]{10}[^0-9])"), "\\1 commodity \\2"),
+    (lambda x: x.length == 8 and is_spaced(x), re.compile("([^g]) ([0-9]{8}[^0-9])"), "\\1 subheading \\2"),
+    (lambda x: x.length == 6 and is_spaced(x), re.compile("([^g]) ([0-9]{6}[^0-9])"), "\\1 subheading \\2"),
+    (lambda x: x.length == 4 and is_spaced(x), re.compile("([^g]) ([0-9]{4}[^0-9])"), "\\1 heading \\2"),
+    (lambda x: x.length == 4 and is_spaced(x), re.compile("([^g]) ([0-9]{4}[^0-9])"), "\\1 heading \\2"),
+
+    # Correct obvious misapplication of entity types
+    (lambda x: x.length == 6 and x.follows(" heading ") and x.next_character != "", re.compile(" heading ([0-9]{6}[^0-9])"), " subheading \\1"),
+    (lambda x: x.length == 8 and x.follows(" heading ") and x.next_character != "", re.compile(" heading ([0-9]{8}[^0-9])"), " subheading \\1"),
+    (lambda x: x.length >= 10 and x.follows(" heading "), re.compile(" heading ([0-9]{10})"), " commodity \\1"),
+    (lambda x: x.length == 4 and x.follows(" headings ") and x.next_character == ",", re.compile(" headings ([0-9]{4}),"), " heading \\1,")
+]
+
 
 class InterceptMessage(object):
-    def __init__(self, term, message, typos_file_path):
+    __slots__ = [
+        "term", "message", "is_valid", "is_country", "erroneous_digits", "erroneous_digit",
+        "typo_corrector", "diagnostics", "timings", "rule_profile", "tokenized_message", "code_references"
+    ]
+    # Working state that is rebuilt as needed, so is not pickled or cached
+    transient_slots = ["typo_corrector", "tokenized_message", "code_references"]
+
+    # Steps that do not depend on the term, so can be shared by every term with the same
+    # message. Only replace_countries comes before them, and it does nothing unless the
+    # message is COUNTRY
+    compile_steps = [
+        "tidy_characters",
+        "deal_with_pipes",
+        "end_sentence",
+        "check_for_odd_numbers_of_digits",
+        "correct_typos"
+    ]
+    render_steps = [
+        "standardise_shorthand",
+        "replace_hmrc_shortcuts",
+        "standardise_headings",
+        "check_code_validity",
+        "final_message_tidy",
+        "insert_atar",
+        "check_usefulness"
+    ]
+    format_steps = ["replace_countries"] + compile_steps + render_steps
+
+    def __init__(self, term, message, typo_corrector, record_timings=False, steps=None, profile_rules=False):
         self.term = term
         self.is_valid = True
         self.is_country = False
         # print(self.term)
         self.message = message
-        self.typos_file_path = typos_file_path
+        self.typo_corrector = typo_corrector
+        self.diagnostics = Diagnostics()
+        self.timings = {} if record_timings else None
+        self.rule_profile = {} if profile_rules else None
+        self.tokenized_message = None
 
         self.format_term()
-        self.format_message()
-        self.create_yaml()
-        self.create_yaml_for_prototype()
+        self.format_message(self.format_steps if steps is None else steps)
+
+    def __getstate__(self):
+        # The shared typo corrector is not needed once the message has been formatted
+        return {name: getattr(self, name) for name in self.__slots__ if name not in self.transient_slots}
+
+    def __setstate__(self, state):
+        self.typo_corrector = None
+        self.tokenized_message = None
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def copy_for_term(self, term):
+        # Shares a partly or fully formatted message with another term. The diagnostics
+        # are keyed by term, so are copied for the new term
+        intercept_message = InterceptMessage.__new__(InterceptMessage)
+        intercept_message.__setstate__(self.__getstate__())
+        intercept_message.term = term
+        intercept_message.format_term()
+        intercept_message.typo_corrector = self.typo_corrector
+        intercept_message.diagnostics = self.diagnostics.copy_for_term(intercept_message.term)
+        intercept_message.timings = None if self.timings is None else {}
+        # The rules made the same replacements for the new term, but took no time
+        if self.rule_profile is not None:
+            intercept_message.rule_profile = {key: (replacements, 0.0) for key, (replacements, seconds) in self.rule_profile.items()}
+        return intercept_message
 
     def format_term(self):
         self.term = self.term.strip()
 
-    def format_message(self):
-        self.replace_countries()
+    def format_message(self, steps):
+        if self.timings is None:
+            for step in steps:
+                getattr(self, step)()
+        else:
+            for step in steps:
+                start = time.perf_counter()
+                getattr(self, step)()
+                self.timings[step] = time.perf_counter() - start
+
+    def tidy_characters(self):
         self.message = self.message.strip()
         self.message = self.message.replace('"', "'")
         self.message = self.message.replace(' ,', ",")
         self.message = self.message.replace('\xa0', " ")
 
-        self.deal_with_pipes()
+    def end_sentence(self):
         if self.message[-1] != ".":
             self.message += "."
         self.message = self.message.replace("\n", "\n              ")
 
-        self.check_for_odd_numbers_of_digits()
-        self.correct_typos()
-        self.standardise_shorthand()
-        self.replace_hmrc_shortcuts()
-        self.standardise_headings()
-        self.check_code_validity()
-        self.final_message_tidy()
-        self.insert_atar()
-        self.check_usefulness()
-
     def replace_countries(self):
         template = "See more information about trading with [{country}](https://www.gov.uk/world/organisations/department-for-international-trade-{country2})"
         if "COUNTRY" in self.message:
@@ -80,192 +173,138 @@ class InterceptMessage(object):
             tier = tiers[len(entity)]
             self.message = template.format(term=term, tier=tier, entity=entity)
 
+    def get_code_references(self):
+        # The message is only tokenized again once it has changed
+        if self.tokenized_message != self.message:
+            self.code_references = code_tokenizer.get_code_references(code_tokenizer.tokenize(self.message))
+            self.tokenized_message = self.message
+        return self.code_references
+
     def replace_hmrc_shortcuts(self):
         if self.term == "aerosol can":
             a = 1
-        self.message = re.sub("([^0-9][0-9]{4}), ([0-9]{4}[^0-9])", "\\1/\\2", self.message)
-        for i in range(8, -1, -1):
-            to_find = "([^0-9][0-9]{4})/" + ("([0-9]{4})/" * i) + "([0-9]{4}[^0-9])"
-            to_replace = "\\1"
-            for j in range(0, i):
-                to_replace += ", \\" + str(j + 2)
-            to_replace += " or heading \\" + str(i + 2)
-            self.message = re.sub(to_find, to_replace, self.message)
+        # The shortcuts are lists of headings, so there is nothing to do without one
+        if not self.has_heading_list():
+            return
+        for index, (pattern, to_replace) in enumerate(hmrc_shortcuts):
+            self.sub(("replace_hmrc_shortcuts", index), pattern, to_replace)
+
+    def sub(self, key, pattern, to_replace):
+        if self.rule_profile is None:
+            self.message = pattern.sub(to_replace, self.message)
+        else:
+            self.message = rule_profile.sub(self.rule_profile, key, pattern, to_replace, self.message)
+
+    def has_heading_list(self):
+        previous = None
+        for reference in self.get_code_references():
+            if reference.length == 4 and previous is not None and previous.length == 4:
+                if reference.separator in ("/", ", ") and reference.group == previous.group:
+                    return True
+            previous = reference
+        return False
 
     def check_code_validity(self):
-        self.check_headings("heading ([0-9]{4})[^0-9]")
-        self.check_headings("subheading ([0-9]{6})[^0-9]")
-        self.check_headings("subheading ([0-9]{8})[^0-9]")
-        self.check_headings("commodity ([0-9]{10})[^0-9]")
-
-    def check_headings(self, substring):
-        if "subheading" in substring:
-            claimed_entity = "subheading"
-        elif "heading" in substring:
-            claimed_entity = "heading"
-        elif "commodity" in substring:
-            claimed_entity = "commodity"
+        self.check_headings(4, "heading ", "heading")
+        self.check_headings(6, "subheading ", "subheading")
+        self.check_headings(8, "subheading ", "subheading")
+        self.check_headings(10, "commodity ", "commodity")
+
+    def check_headings(self, length, word, claimed_entity):
+        # Checks the first code of the given length that follows the given word
+        for reference in self.get_code_references():
+            if reference.length == length and reference.next_character != "" and reference.follows(word, ignore_case=True):
+                self.check_heading(reference.digits, claimed_entity)
+                break
+
+    def check_heading(self, group, claimed_entity):
+        code = group.ljust(10, "0")
+        if code not in g.commodities:
+            obj = {
+                self.term: {
+                    "verbatim": group,
+                    "commodity": code
+                }
+            }
+            self.diagnostics.incorrect_commodities.append(obj)
         else:
-            claimed_entity = ""
-
-        matches = re.search(substring, self.message, re.IGNORECASE)
-        if matches:
-            groups = list(matches.groups())
-            for group in groups:
-                code = group.ljust(10, "0")
-                if code not in g.commodities:
-                    obj = {
-                        self.term: {
-                            "verbatim": group,
-                            "commodity": code
-                        }
-                    }
-                    g.incorrect_commodities.append(obj)
-                else:
-                    actual_entity = g.commodities_dict[code]
-                    if claimed_entity != "":
-                        if claimed_entity != actual_entity:
+            actual_entity = g.commodities.entity_type(code)
+            if claimed_entity != "":
+                if claimed_entity != actual_entity:
+                    a = 1
+                    if self.term == "face paint":
+                        a = 1
+                    if claimed_entity == "heading":
+                        if actual_entity == "commodity":
+                            self.message = self.message.replace("heading " + group, "commodity " + code)
+                        elif actual_entity == "subheading":
+                            self.message = self.message.replace("heading " + group, "subheading " + group)
+                    elif claimed_entity == "subheading":
+                        if actual_entity == "commodity":
+                            self.message = self.message.replace("subheading " + group, "commodity " + code)
+                            a = 1
+                        else:
                             a = 1
-                            if self.term == "face paint":
-                                a = 1
-                            if claimed_entity == "heading":
-                                if actual_entity == "commodity":
-                                    self.message = self.message.replace("heading " + group, "commodity " + code)
-                                elif actual_entity == "subheading":
-                                    self.message = self.message.replace("heading " + group, "subheading " + group)
-                            elif claimed_entity == "subheading":
-                                if actual_entity == "commodity":
-                                    self.message = self.message.replace("subheading " + group, "commodity " + code)
-                                    a = 1
-                                else:
-                                    a = 1
-                            elif claimed_entity == "commodity":
-                                a = 1
+                    elif claimed_entity == "commodity":
+                        a = 1
 
     def check_for_odd_numbers_of_digits(self):
         self.erroneous_digits = False
         self.erroneous_digit = None
         odd_digits = [5, 7, 9]
+        lengths = set(reference.length for reference in self.get_code_references() if reference.is_bounded())
         for digit in odd_digits:
-            substring = "[^0-9][0-9]{" + str(digit) + "}[^0-9]"
-            matches = re.search(substring, self.message, re.IGNORECASE)
-            if matches is not None:
+            if digit in lengths:
                 self.erroneous_digits = True
                 self.erroneous_digit = digit
                 obj = {
                     self.term: self.erroneous_digit
                 }
-                g.erroneous_digits.append(obj)
+                self.diagnostics.erroneous_digits.append(obj)
                 break
 
     def standardise_shorthand(self):
-        pluralizer = Pluralizer()
-        term_pluralised = pluralizer.pluralize(self.term, 2, False).capitalize()
-
-        self.message = self.message.replace("TERMS CLASS", term_pluralised + " are classified under")
-        self.message = self.message.replace("TERM CLASS", self.term.capitalize() + " is classified under")
-
-        self.message = self.message.replace("TERM CCHAP", self.term.capitalize() + " is classified under chapter")
-        self.message = self.message.replace("TERM CHEAD", self.term.capitalize() + " is classified under heading")
-        self.message = self.message.replace("TERM CSHEAD", self.term.capitalize() + " is classified under subheading")
-        self.message = self.message.replace("TERM CCOMM", self.term.capitalize() + " is classified under commodity")
-
-        self.message = self.message.replace("TERMS", term_pluralised)
-        self.message = self.message.replace("TERM", self.term.capitalize())
-
-        self.message = self.message.replace("CCHAP", "are classified under chapter")
-        self.message = self.message.replace("CHEAD", "are classified under heading")
-        self.message = self.message.replace("CSHEAD", "are classified under subheading")
-        self.message = self.message.replace("CCOMM", "are classified under commodity")
-
-        self.message = re.sub("(classified under chapter) ([0-9]{2})/([0-9]{2})/([0-9]{2})/([0-9]{2})", "\\1 \\2, chapter \\3, chapter \\4 or chapter \\5", self.message)
-        self.message = re.sub("(classified under chapter) ([0-9]{2})/([0-9]{2})/([0-9]{2})", "\\1 \\2, chapter \\3 or chapter \\4", self.message)
-        self.message = re.sub("(classified under chapter) ([0-9]{2})/([0-9]{2})", "\\1 \\2 or chapter \\3", self.message)
-
-        self.message = self.message.replace("PRECISE", "The full commodity code")
-        self.message = self.message.replace("TOO GENERIC", "The search term entered is too generic. Please enter the specific type of goods.")
-        self.message = self.message.replace("NOT PHYSICAL", "The search term entered is not a physical item")
-        self.message = self.message.replace("NOT REQUIRED", "A commodity code is not required for this item")
-        self.message = re.sub("heading([^ ])", "heading \\1", self.message)
+        term_pluralised = get_pluralizer().pluralize(self.term, 2, False).capitalize()
+        self.message = standardise_shorthand_rules.apply(self.message, self.term.capitalize(), term_pluralised, self.rule_profile)
 
     def standardise_headings(self):
-        self.message = re.sub("\s+", " ", self.message)
-        # Go easy where the terms commodity, heading or subheading have been omitted
-        self.message = re.sub("([^ye]) ([0-9]{10}[^0-9])", "\\1 commodity \\2", self.message)
-        self.message = re.sub("([^g]) ([0-9]{8}[^0-9])", "\\1 subheading \\2", self.message)
-        self.message = re.sub("([^g]) ([0-9]{6}[^0-9])", "\\1 subheading \\2", self.message)
-        self.message = re.sub("([^g]) ([0-9]{4}[^0-9])", "\\1 heading \\2", self.message)
-        self.message = re.sub("([^g]) ([0-9]{4}[^0-9])", "\\1 heading \\2", self.message)
-
-        # Correct obvious misapplication of entity types
-        self.message = re.sub(" heading ([0-9]{6}[^0-9])", " subheading \\1", self.message)
-        self.message = re.sub(" heading ([0-9]{8}[^0-9])", " subheading \\1", self.message)
-        self.message = re.sub(" heading ([0-9]{10})", " commodity \\1", self.message)
-        self.message = re.sub(" headings ([0-9]{4}),", " heading \\1,", self.message)
+        self.message = whitespace_pattern.sub(" ", self.message)
+        for index, (condition, pattern, to_replace) in enumerate(standardise_headings_rules):
+            if self.has_reference(condition):
+                self.sub(("standardise_headings", index), pattern, to_replace)
+
+    def has_reference(self, condition):
+        return any(condition(reference) for reference in self.get_code_references())
 
     def final_message_tidy(self):
-        self.message = self.message.replace("..", ".")
-        self.message = re.sub("\s+", " ", self.message)
-        if "http" not in self.message:
-            self.message = self.message.replace("/", " / ")
-        self.message = self.message.replace("to heading", "under heading")
-        self.message = self.message.replace("to subheading", "under subheading")
-        self.message = self.message.replace("to commodity", "under commodity")
-        self.message = self.message.replace("heading commodity", "commodity")
-        self.message = self.message.replace(", then", " then")
-        self.message = self.message.replace("then, dependent", ", then the full commodity code is dependent")
-        self.message = self.message.replace(" if of ", " if the item is of ")
-        self.message = self.message.replace(" if a ", " if the item is a ")
-        self.message = self.message.replace(" if an ", " if the item is an ")
-        self.message = self.message.replace(" then The ", " then the ")
-        self.message = self.message.replace("dependent on what it's used for", "dependent on what the item is used for")
-
-        self.message = self.message.replace(" ,", ",")
-        self.message = self.message.replace(",", ", ")
-        self.message = self.message.replace(" .", ".")
-        self.message = self.message.replace(",.", ".")
-        self.message = self.message.replace("?.", "?")
-
-        self.message = re.sub("([0-9])or ", "\\1, or ", self.message)
-        self.message = re.sub(", or ", " or ", self.message)
-        self.message = re.sub("([0-9]) then", "\\1, then", self.message)
-        self.message = re.sub("([^,]) as long as", "\\1, as long as", self.message)
-        self.message = re.sub("([0-9]) dependent", "\\1, dependent", self.message)
-        self.message = re.sub("is dependent if", "depends whether", self.message)
-        self.message = re.sub("is dependent on", "depends on", self.message)
-        self.message = re.sub("are dependent on", "depend on", self.message)
-        self.message = re.sub("dependent on", "depending on", self.message)
-        # self.message = re.sub("dependent if ", "depending whether the item is ", self.message)
-
-        self.message = re.sub("([^,]) then ", "\\1, then ", self.message)
-        self.message = re.sub(", , ", ", ", self.message)
-        self.message = re.sub("\s+", " ", self.message)
+        self.message = final_message_tidy_rules.apply(self.message, profile=self.rule_profile)
         self.message = self.message[0].upper() + self.message[1:]
 
     def correct_typos(self):
         self.correct_would_depend()
-        with open(self.typos_file_path, 'r') as file:
-            reader = csv.reader(file, quotechar='"')
-            for row in reader:
-                term_from = row[0]
-                term_to = row[1]
-                self.message = self.message.replace(term_from, term_to)
+        self.message = self.typo_corrector.correct(self.message, self.rule_profile)
 
     def check_usefulness(self):
         if self.is_valid:
             value_count = 0
-            value_count += self.check_contains("chapter [0-9]{1,2}[^0-9]")
-            value_count += self.check_contains("heading [0-9]{4}[^0-9]")
-            value_count += self.check_contains("subheading [0-9]{6}[^0-9]")
-            value_count += self.check_contains("subheading [0-9]{8}[^0-9]")
-            value_count += self.check_contains("commodity [0-9]{10}[^0-9]")
-            value_count += self.check_contains("section [A-Z]{1,2}[A-Z]")
-            value_count += self.check_contains("http")
-            value_count += self.check_contains("too generic")
-            value_count += self.check_contains("too many")
-            value_count += self.check_contains("not a physical item")
-            value_count += self.check_contains("not required for this item")
-            value_count += self.check_contains("ATAR")
+            for reference in self.get_code_references():
+                if reference.next_character == "":
+                    continue
+                if reference.length <= 2 and reference.follows("chapter ", ignore_case=True):
+                    value_count += 1
+                elif reference.length == 4 and reference.follows("heading ", ignore_case=True):
+                    value_count += 1
+                elif reference.length in (6, 8) and reference.follows("subheading ", ignore_case=True):
+                    value_count += 1
+                elif reference.length == 10 and reference.follows("commodity ", ignore_case=True):
+                    value_count += 1
+
+            if section_pattern.search(self.message):
+                value_count += 1
+            message = self.message.casefold()
+            for phrase in ["http", "too generic", "too many", "not a physical item", "not required for this item", "atar"]:
+                if phrase in message:
+                    value_count += 1
 
             if "heading ," in self.message:
                 value_count = 0
@@ -274,7 +313,7 @@ class InterceptMessage(object):
                 obj = {
                     self.term: self.message
                 }
-                g.useless_messages.append(obj)
+                self.diagnostics.useless_messages.append(obj)
 
     def insert_atar(self):
         if self.term == "bedroom furnitu":
@@ -284,13 +323,6 @@ class InterceptMessage(object):
             self.message += " " + atar_message
             a = 1
 
-    def check_contains(self, substring):
-        matches = re.search(substring, self.message, re.IGNORECASE)
-        if matches:
-            return 1
-        else:
-            return 0
-
     def correct_would_depend(self):
         if self.term == "safety footwear":
             a = 1
@@ -298,22 +330,47 @@ class InterceptMessage(object):
         self.message = re.sub("([0-9]{2,10})\sWould depend", "\\1. PRECISE would depend", self.message)
 
     def create_yaml_safe(self):
-        self.yaml = ""
-        self.yaml += "  " + self.term + ":\n"
-        self.yaml += "    title: \"" + self.term + "\"\n"
-        self.yaml += "    message: \"" + self.message + "\"\n\n"
+        yaml = ""
+        yaml += "  " + self.term + ":\n"
+        yaml += "    title: \"" + self.term + "\"\n"
+        yaml += "    message: \"" + self.message + "\"\n\n"
+        return yaml
 
     def create_yaml(self):
-        self.yaml = ""
-        self.yaml += self.term + ": "
-        self.yaml += '"' + self.message + '"\n'
+        return render_yaml(self.term, self.message)
 
     def create_yaml_for_prototype(self):
-        if "\n" not in self.message:
-            self.yaml_for_prototype = "---\n"
-            self.yaml_for_prototype += "term: " + self.term + "\n"
-            self.yaml_for_prototype += "message: |\n"
-            self.yaml_for_prototype += "  " + self.message + "\"\n\n"
-            self.yaml_for_prototype += "...\n\n"
-        else:
-            self.yaml_for_prototype = ""
+        return render_yaml_for_prototype(self.term, self.message)
+
+
+# The renderers take the term and message rather than a message object, so that they
+# can also be used for the rows of a streamed run
+def render_yaml(term, message):
+    return term + ': "' + message + '"\n'
+
+
+def render_yaml_for_prototype(term, message):
+    if "\n" not in message:
+        return "---\nterm: " + term + "\nmessage: |\n  " + message + "\"\n\n...\n\n"
+    else:
+        return ""
+
+
+def get_pluralizer():
+    # Imported on first use, so that starting up does not wait for it
+    global pluralizer
+    if pluralizer is None:
+        from pluralizer import Pluralizer
+        pluralizer = Pluralizer()
+    return pluralizer
+
+
+def get_rule_sets(typo_corrector):
+    # Describes the rules that are profiled, in the order that they are applied
+    return {
+        "typos": [[term_from, term_to] for term_from, term_to in typo_corrector.rules],
+        "standardise_shorthand": standardise_shorthand_rules.describe(),
+        "replace_hmrc_shortcuts": [[pattern.pattern, to_replace] for pattern, to_replace in hmrc_shortcuts],
+        "standardise_headings": [[pattern.pattern, to_replace] for condition, pattern, to_replace in standardise_headings_rules],
+        "final_message_tidy": final_message_tidy_rules.describe()
+    }
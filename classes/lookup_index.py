@@ -0,0 +1,155 @@
+import mmap
+import os
+import struct
+
+# The file starts with a header, followed by these tables:
+#   entries   - one (term offset, term length, message index, trigram count) per term,
+#               sorted by the normalised term, so that a term can be found by binary search
+#   messages  - one (offset, length) per distinct message
+#   trigrams  - one (trigram, postings offset, postings count) per trigram, sorted by trigram
+#   postings  - the entry numbers of the terms that contain each trigram
+#   strings   - the UTF-8 terms and messages that the tables point to
+MAGIC = b"ZRLI"
+VERSION = 1
+HEADER = struct.Struct("<4sIIII")
+ENTRY = struct.Struct("<IIII")
+MESSAGE = struct.Struct("<II")
+TRIGRAM = struct.Struct("<III")
+POSTING = struct.Struct("<I")
+
+
+def normalise(term):
+    return " ".join(term.casefold().split())
+
+
+def get_trigrams(term):
+    # Trigrams of the UTF-8 bytes of the padded term, each packed into an integer
+    padded = b"  " + term.encode("utf-8") + b" "
+    return set((padded[i] << 16) | (padded[i + 1] << 8) | padded[i + 2] for i in range(0, len(padded) - 2))
+
+
+def write_lookup_index(file_path, records):
+    # Where a term appears more than once, the last message is used, as when the YAML is loaded
+    lookup = {}
+    for term, message in records:
+        lookup[normalise(term).encode("utf-8")] = message
+    terms = sorted(lookup)
+
+    strings = bytearray()
+    message_indexes = {}
+    message_table = []
+    for term in terms:
+        message = lookup[term]
+        if message not in message_indexes:
+            message_indexes[message] = len(message_table)
+            message_table.append(message.encode("utf-8"))
+
+    entry_table = []
+    postings = {}
+    for index, term in enumerate(terms):
+        trigrams = get_trigrams(term.decode("utf-8"))
+        entry_table.append((term, message_indexes[lookup[term]], len(trigrams)))
+        for trigram in trigrams:
+            postings.setdefault(trigram, []).append(index)
+
+    entries_offset = HEADER.size
+    messages_offset = entries_offset + ENTRY.size * len(entry_table)
+    trigrams_offset = messages_offset + MESSAGE.size * len(message_table)
+    postings_offset = trigrams_offset + TRIGRAM.size * len(postings)
+    strings_offset = postings_offset + POSTING.size * sum(len(indexes) for indexes in postings.values())
+
+    # Written to a temporary file first, so that a reader never maps half an index
+    temp_file_path = f'{file_path}.{os.getpid()}.tmp'
+    with open(temp_file_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(entry_table), len(message_table), len(postings)))
+        for term, message_index, trigram_count in entry_table:
+            f.write(ENTRY.pack(strings_offset + len(strings), len(term), message_index, trigram_count))
+            strings += term
+        for message in message_table:
+            f.write(MESSAGE.pack(strings_offset + len(strings), len(message)))
+            strings += message
+        posting_index = 0
+        for trigram in sorted(postings):
+            f.write(TRIGRAM.pack(trigram, postings_offset + POSTING.size * posting_index, len(postings[trigram])))
+            posting_index += len(postings[trigram])
+        for trigram in sorted(postings):
+            f.write(b"".join(POSTING.pack(index) for index in postings[trigram]))
+        f.write(strings)
+    os.replace(temp_file_path, file_path)
+
+
+class LookupIndex(object):
+    # Reads a lookup index through a memory map, so that opening it does not read the file
+    def __init__(self, file_path):
+        self.file = open(file_path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.entry_count, self.message_count, self.trigram_count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{file_path} is not a lookup index')
+        self.entries_offset = HEADER.size
+        self.messages_offset = self.entries_offset + ENTRY.size * self.entry_count
+        self.trigrams_offset = self.messages_offset + MESSAGE.size * self.message_count
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __len__(self):
+        return self.entry_count
+
+    def get(self, query):
+        # Returns the message for a query, or None if the term is not in the index
+        key = normalise(query).encode("utf-8")
+        low = 0
+        high = self.entry_count
+        while low < high:
+            middle = (low + high) // 2
+            term = self.get_term(middle)
+            if term < key:
+                low = middle + 1
+            elif term > key:
+                high = middle
+            else:
+                return self.get_message(middle)
+        return None
+
+    def search(self, query, limit=5, min_similarity=0.4):
+        # Returns the closest terms to a query with their messages and similarity, by the
+        # share of trigrams that they have in common
+        trigrams = get_trigrams(normalise(query))
+        counts = {}
+        for trigram in trigrams:
+            for index in self.get_postings(trigram):
+                counts[index] = counts.get(index, 0) + 1
+
+        matches = []
+        for index, shared in counts.items():
+            trigram_count = ENTRY.unpack_from(self.data, self.entries_offset + ENTRY.size * index)[3]
+            similarity = shared / (len(trigrams) + trigram_count - shared)
+            if similarity >= min_similarity:
+                matches.append((-similarity, index))
+        matches.sort()
+        return [(self.get_term(index).decode("utf-8"), self.get_message(index), -score) for score, index in matches[:limit]]
+
+    def get_term(self, index):
+        offset, length, message_index, trigram_count = ENTRY.unpack_from(self.data, self.entries_offset + ENTRY.size * index)
+        return self.data[offset:offset + length]
+
+    def get_message(self, index):
+        message_index = ENTRY.unpack_from(self.data, self.entries_offset + ENTRY.size * index)[2]
+        offset, length = MESSAGE.unpack_from(self.data, self.messages_offset + MESSAGE.size * message_index)
+        return self.data[offset:offset + length].decode("utf-8")
+
+    def get_postings(self, trigram):
+        low = 0
+        high = self.trigram_count
+        while low < high:
+            middle = (low + high) // 2
+            key, offset, count = TRIGRAM.unpack_from(self.data, self.trigrams_offset + TRIGRAM.size * middle)
+            if key < trigram:
+                low = middle + 1
+            elif key > trigram:
+                high = middle
+            else:
+                return [index for (index,) in POSTING.iter_unpack(self.data[offset:offset + POSTING.size * count])]
+        return []
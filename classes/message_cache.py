@@ -0,0 +1,95 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from classes.diagnostics import Diagnostics
+from classes.intercept_message import InterceptMessage
+
+# Increase this to discard every cached message, e.g. after a change outside the classes folder
+PIPELINE_VERSION = "1"
+
+
+class MessageCache(object):
+    # Number of new or used entries held in memory before they are written to the cache
+    flush_size = 10000
+
+    def __init__(self, cache_file_path, max_entries, fingerprint):
+        self.max_entries = max_entries
+        self.fingerprint = fingerprint
+        self.run_stamp = int(time.time())
+        self.hit_keys = []
+        self.new_rows = []
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(cache_file_path), exist_ok=True)
+        # Sources converted in a batch can share the cache, so writers wait for each other
+        self.connection = sqlite3.connect(cache_file_path, timeout=60)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS messages (key TEXT PRIMARY KEY, value TEXT, last_used INTEGER)")
+
+    def get_key(self, term, message):
+        s = self.fingerprint + "\0" + term + "\0" + message
+        return hashlib.sha256(s.encode("utf-8")).hexdigest()
+
+    def get(self, term, message):
+        key = self.get_key(term, message)
+        row = self.connection.execute("SELECT value FROM messages WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.hit_keys.append(key)
+        if len(self.hit_keys) >= self.flush_size:
+            self.flush()
+        state = json.loads(row[0])
+        diagnostics = Diagnostics()
+        diagnostics.__dict__.update(state.pop("diagnostics"))
+        intercept_message = InterceptMessage.__new__(InterceptMessage)
+        intercept_message.__setstate__(state)
+        intercept_message.diagnostics = diagnostics
+        intercept_message.timings = None
+        intercept_message.rule_profile = None
+        return intercept_message
+
+    def put(self, term, message, intercept_message):
+        state = intercept_message.__getstate__()
+        del state["timings"]
+        del state["rule_profile"]
+        state["diagnostics"] = intercept_message.diagnostics.__dict__
+        self.new_rows.append((self.get_key(term, message), json.dumps(state), self.run_stamp))
+        if len(self.new_rows) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        # Writes the new entries and records which entries were used
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO messages (key, value, last_used) VALUES (?, ?, ?)", self.new_rows)
+            self.connection.executemany("UPDATE messages SET last_used = ? WHERE key = ?", [(self.run_stamp, key) for key in self.hit_keys])
+        self.new_rows = []
+        self.hit_keys = []
+
+    def close(self):
+        # Evicts the least recently used entries once every entry has been written
+        self.flush()
+        with self.connection:
+            self.connection.execute(
+                "DELETE FROM messages WHERE key IN (SELECT key FROM messages ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+        self.connection.close()
+        print(f'{self.hits} messages were read from the cache and {self.misses} were formatted.')
+
+
+def get_fingerprint(typos_file_path, codes_file, country_failures):
+    # Identifies the reference data and formatting code that a cached message depends on
+    sha = hashlib.sha256()
+    sha.update(PIPELINE_VERSION.encode("utf-8"))
+    sources = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "*.py")))
+    for filename in [typos_file_path, codes_file] + sources:
+        with open(filename, "rb") as f:
+            sha.update(f.read())
+    sha.update(json.dumps(country_failures, sort_keys=True).encode("utf-8"))
+    return sha.hexdigest()
@@ -0,0 +1,54 @@
+import collections
+from classes.intercept_message import InterceptMessage
+
+
+class MessageCompiler(object):
+    # Formats messages in two phases. The compile phase does not depend on the term, so
+    # is run once per distinct message and shared by every term with that message, such
+    # as the genuine term aliases of a row. Where the compiled message does not use the
+    # term at all, the rendered message is shared as well
+    def __init__(self, typo_corrector, record_timings=False, profile_rules=False, cache_size=10000):
+        self.typo_corrector = typo_corrector
+        self.record_timings = record_timings
+        self.profile_rules = profile_rules
+        self.cache_size = cache_size
+        self.compiled = collections.OrderedDict()
+        self.rendered = collections.OrderedDict()
+
+    def format(self, term, message):
+        # Country messages are made from the term, so are always formatted in full
+        if "COUNTRY" in message:
+            return InterceptMessage(term, message, self.typo_corrector, self.record_timings, profile_rules=self.profile_rules)
+
+        rendered = self.get(self.rendered, message)
+        if rendered is not None:
+            return rendered.copy_for_term(term)
+
+        compiled = self.get(self.compiled, message)
+        if compiled is None:
+            compiled = InterceptMessage(term, message, self.typo_corrector, self.record_timings, InterceptMessage.compile_steps, self.profile_rules)
+            self.put(self.compiled, message, compiled)
+            intercept_message = compiled.copy_for_term(term)
+            if compiled.timings is not None:
+                intercept_message.timings = dict(compiled.timings)
+            if compiled.rule_profile is not None:
+                intercept_message.rule_profile = dict(compiled.rule_profile)
+        else:
+            intercept_message = compiled.copy_for_term(term)
+
+        intercept_message.format_message(InterceptMessage.render_steps)
+        # The term is only ever inserted in place of the TERM and TERMS shorthand
+        if "TERM" not in compiled.message:
+            self.put(self.rendered, message, intercept_message)
+        return intercept_message
+
+    def get(self, cache, message):
+        if message in cache:
+            cache.move_to_end(message)
+            return cache[message]
+        return None
+
+    def put(self, cache, message, intercept_message):
+        cache[message] = intercept_message
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
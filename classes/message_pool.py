@@ -0,0 +1,31 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from classes.message_compiler import MessageCompiler
+import classes.globals as g
+
+compiler = None
+
+
+def initialise_worker(commodities, country_failures, corrector, timings, profile_rules):
+    # Worker processes are given the reference data explicitly, so that this also
+    # works where processes are spawned rather than forked
+    global compiler
+    g.commodities = commodities
+    g.country_failures = country_failures
+    compiler = MessageCompiler(corrector, timings, profile_rules)
+
+
+def format_message(job):
+    term, message = job
+    return compiler.format(term, message)
+
+
+def format_messages(jobs, workers, corrector, timings=False, profile_rules=False, batch_size=2000):
+    # Jobs are submitted a batch at a time, so that a streamed source is never read
+    # far ahead of the messages that have been formatted
+    initargs = (g.commodities, g.country_failures, corrector, timings, profile_rules)
+    chunksize = max(1, batch_size // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=initialise_worker, initargs=initargs) as executor:
+        for batch in iter(lambda: list(itertools.islice(jobs, batch_size)), []):
+            for intercept_message in executor.map(format_message, batch, chunksize=chunksize):
+                yield intercept_message
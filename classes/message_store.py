@@ -0,0 +1,24 @@
+import sys
+
+
+class MessageStore(object):
+    # Keeps only the term and formatted message of each valid message, in parallel lists.
+    # Messages are interned, as many terms share the same formatted message
+    def __init__(self):
+        self.terms = []
+        self.messages = []
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __iter__(self):
+        return zip(self.terms, self.messages)
+
+    def append(self, intercept_message):
+        self.terms.append(intercept_message.term)
+        self.messages.append(sys.intern(intercept_message.message))
+
+    def sort(self):
+        order = sorted(range(0, len(self.terms)), key=self.terms.__getitem__)
+        self.terms = [self.terms[i] for i in order]
+        self.messages = [self.messages[i] for i in order]
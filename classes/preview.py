@@ -0,0 +1,171 @@
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from classes.excel import Excel, normalise_term
+from classes.diagnostics import Diagnostics
+from classes.message_store import MessageStore
+from classes.message_compiler import MessageCompiler
+from classes.intercept_message import InterceptMessage, get_pluralizer
+
+digit_pattern = re.compile("[0-9]")
+
+
+class Preview(object):
+    # Keeps the reference data loaded between conversions. The watched files are polled,
+    # and when one changes only the rows it can affect are formatted again
+    def __init__(self, port=8001, interval=1.0):
+        self.port = port
+        self.interval = interval
+        self.excel = Excel()
+        get_pluralizer()
+        self.formatted = {}
+        self.modified_times = self.get_modified_times()
+
+    def get_watched_files(self):
+        return {
+            "source": self.excel.source_file_path,
+            "codes": self.excel.codes_file,
+            "country_failures": self.excel.country_failures_file_path,
+            "typos": self.excel.typos_file_path
+        }
+
+    def get_modified_times(self):
+        modified_times = {}
+        for name, file_path in self.get_watched_files().items():
+            modified_times[name] = os.stat(file_path).st_mtime_ns if os.path.exists(file_path) else None
+        return modified_times
+
+    def run(self):
+        server = ThreadingHTTPServer(("127.0.0.1", self.port), self.get_handler())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f'Formatting messages at http://127.0.0.1:{self.port}/format?term=...&message=...')
+
+        self.update([])
+        try:
+            while True:
+                time.sleep(self.interval)
+                modified_times = self.get_modified_times()
+                changed = [name for name in modified_times if modified_times[name] != self.modified_times[name]]
+                if changed:
+                    self.modified_times = modified_times
+                    print(f'{", ".join(changed)} changed')
+                    self.update(changed)
+        except KeyboardInterrupt:
+            server.shutdown()
+
+    def update(self, changed):
+        # A file that is half saved or invalid is reported, and the files are watched
+        # until it is fixed
+        try:
+            self.reload(changed)
+            self.refresh()
+        except Exception as e:
+            print(f'Could not refresh the outputs: {type(e).__name__}: {e}')
+            # The reference data may have been partly reloaded, so nothing is reused
+            if any(name != "source" for name in changed):
+                self.formatted = {}
+
+    def reload(self, changed):
+        # Forgets the formatted rows that the changed reference data could affect. Each part
+        # of the reference data is replaced once it has been read, so the endpoint keeps
+        # formatting messages with the previous data in the meantime
+        reference_files = [name for name in changed if name != "source"]
+        if not reference_files:
+            return
+        self.excel.load_reference_data()
+        if "typos" in reference_files:
+            self.formatted = {}
+        if "codes" in reference_files:
+            self.forget(lambda term, message: digit_pattern.search(term + message))
+        if "country_failures" in reference_files:
+            self.forget(lambda term, message: "COUNTRY" in message)
+
+    def forget(self, is_affected):
+        self.formatted = {job: intercept_message for job, intercept_message in self.formatted.items() if not is_affected(*job)}
+
+    def refresh(self):
+        # Rows that have been formatted before are reused, so only new or changed rows
+        # and those affected by changed reference data are formatted
+        excel = self.excel
+        excel.intercept_messages = MessageStore()
+        excel.diagnostics = Diagnostics()
+        excel.is_sorted = False
+        compiler = MessageCompiler(excel.typo_corrector)
+        formatted = {}
+        format_count = 0
+        for job in excel.iter_jobs():
+            intercept_message = formatted.get(job) or self.formatted.get(job)
+            if intercept_message is None:
+                intercept_message = compiler.format(*job)
+                format_count += 1
+            formatted[job] = intercept_message
+            excel.diagnostics.merge(intercept_message.diagnostics)
+            if intercept_message.is_valid:
+                excel.intercept_messages.append(intercept_message)
+        self.formatted = formatted
+        excel.write()
+        print(f'{format_count} of {len(formatted)} messages were formatted.')
+
+    def format_message(self, term, message):
+        # Formats a message as a row of the source would be, without waiting for a refresh
+        intercept_message = InterceptMessage(normalise_term(term, message), message, self.excel.typo_corrector)
+        return {
+            "term": intercept_message.term,
+            "message": intercept_message.message,
+            "is_valid": intercept_message.is_valid,
+            "diagnostics": intercept_message.diagnostics.__dict__
+        }
+
+    def get_handler(self):
+        preview = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path != "/format":
+                    self.send_json(404, {"error": "Not found"})
+                    return
+                query = parse_qs(url.query)
+                self.format(query.get("term", [""])[0], query.get("message", [""])[0])
+
+            def do_POST(self):
+                if urlparse(self.path).path != "/format":
+                    self.send_json(404, {"error": "Not found"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    body = json.loads(self.rfile.read(length))
+                except ValueError:
+                    body = None
+                if not isinstance(body, dict):
+                    self.send_json(400, {"error": "The body must be a JSON object with a term and message"})
+                    return
+                self.format(str(body.get("term", "")), str(body.get("message", "")))
+
+            def format(self, term, message):
+                if message.strip() == "":
+                    self.send_json(400, {"error": "A message is required"})
+                    return
+                try:
+                    result = preview.format_message(term, message.strip())
+                except Exception as e:
+                    self.send_json(500, {"error": f'Could not format the message: {type(e).__name__}: {e}'})
+                    return
+                self.send_json(200, result)
+
+            def send_json(self, status, obj):
+                body = json.dumps(obj).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,45 @@
+import glob
+import hashlib
+import os
+import pickle
+
+# Increase this to discard the snapshot, e.g. after a change outside the classes folder
+SNAPSHOT_VERSION = "1"
+
+
+class ReferenceSnapshot(object):
+    # A pickled copy of the reference data, so that it does not have to be parsed again on
+    # every run. The file starts with a fingerprint of the files it was built from, so a
+    # stale snapshot is found without reading the rest of it
+    def __init__(self, snapshot_file_path, source_file_paths, options=""):
+        self.snapshot_file_path = snapshot_file_path
+        self.fingerprint = self.get_fingerprint(source_file_paths, options)
+
+    def get_fingerprint(self, source_file_paths, options):
+        # The size and modification time of each file stand in for its contents, so that
+        # checking the snapshot does not mean reading the files it replaces
+        sources = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "*.py")))
+        sha = hashlib.sha256()
+        sha.update((SNAPSHOT_VERSION + "\0" + options).encode("utf-8"))
+        for filename in list(source_file_paths) + sources:
+            stat = os.stat(filename)
+            sha.update(f'\0{os.path.abspath(filename)}\0{stat.st_size}\0{stat.st_mtime_ns}'.encode("utf-8"))
+        return sha.hexdigest().encode("utf-8")
+
+    def load(self):
+        try:
+            with open(self.snapshot_file_path, "rb") as f:
+                if f.readline().rstrip(b"\n") != self.fingerprint:
+                    return None
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+    def save(self, data):
+        # Written to a temporary file first, so that a concurrent run never reads half a snapshot
+        os.makedirs(os.path.dirname(self.snapshot_file_path), exist_ok=True)
+        temp_file_path = f'{self.snapshot_file_path}.{os.getpid()}.tmp'
+        with open(temp_file_path, "wb") as f:
+            f.write(self.fingerprint + b"\n")
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file_path, self.snapshot_file_path)
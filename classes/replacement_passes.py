@@ -0,0 +1,62 @@
+import re
+
+
+class ReplacementPasses(object):
+    def __init__(self, rules):
+        # Rules are (from, to) pairs that would otherwise be applied in order with str.replace
+        self.rules = [(term_from, term_to) for term_from, term_to in rules if term_from != "" and term_from != term_to]
+        self.stages = []
+        self.compile_stages()
+
+    def compile_stages(self):
+        # Rules are grouped into stages of mutually independent rules, so that each
+        # stage can be applied in a single left-to-right pass while giving the same
+        # result as applying every rule in order with str.replace
+        stage = []
+        for rule in self.rules:
+            if any(self.rules_interact(earlier, rule) for earlier in stage):
+                self.stages.append(self.compile_stage(stage))
+                stage = []
+            stage.append(rule)
+        if stage:
+            self.stages.append(self.compile_stage(stage))
+
+    def compile_stage(self, stage):
+        if len(stage) == 1:
+            return (None, dict(stage))
+        lookup = dict(stage)
+        alternatives = sorted(lookup.keys(), key=len, reverse=True)
+        pattern = re.compile("|".join(re.escape(alternative) for alternative in alternatives))
+        return (pattern, lookup)
+
+    def rules_interact(self, earlier, later):
+        earlier_from, earlier_to = earlier
+        later_from = later[0]
+        # Deleting text can join its neighbours into a new match for the later rule
+        if earlier_to == "":
+            return True
+        # A match for the later rule could hide a match for the earlier rule. The later
+        # rule may appear inside the earlier one, as the longer alternative is tried first
+        if earlier_from in later_from or self.suffix_is_prefix(later_from, earlier_from):
+            return True
+        # The earlier rule's output could create a new match for the later rule
+        if earlier_to in later_from or later_from in earlier_to:
+            return True
+        if self.suffix_is_prefix(earlier_to, later_from) or self.suffix_is_prefix(later_from, earlier_to):
+            return True
+        return False
+
+    def suffix_is_prefix(self, a, b):
+        for i in range(1, min(len(a), len(b))):
+            if a.endswith(b[:i]):
+                return True
+        return False
+
+    def apply(self, s):
+        for pattern, lookup in self.stages:
+            if pattern is None:
+                for term_from, term_to in lookup.items():
+                    s = s.replace(term_from, term_to)
+            else:
+                s = pattern.sub(lambda match: lookup[match.group(0)], s)
+        return s
@@ -0,0 +1,160 @@
+import re
+from classes.replacement_passes import ReplacementPasses
+from classes import rule_profile
+
+# Placeholders for the capitalised term and its plural, filled in once a block of
+# replacements has run
+TERM = "\x01"
+TERMS = "\x02"
+
+STANDARDISE_SHORTHAND = [
+    ("replace", "TERMS CLASS", TERMS + " are classified under"),
+    ("replace", "TERM CLASS", TERM + " is classified under"),
+
+    ("replace", "TERM CCHAP", TERM + " is classified under chapter"),
+    ("replace", "TERM CHEAD", TERM + " is classified under heading"),
+    ("replace", "TERM CSHEAD", TERM + " is classified under subheading"),
+    ("replace", "TERM CCOMM", TERM + " is classified under commodity"),
+
+    ("replace", "TERMS", TERMS),
+    ("replace", "TERM", TERM),
+
+    ("replace", "CCHAP", "are classified under chapter"),
+    ("replace", "CHEAD", "are classified under heading"),
+    ("replace", "CSHEAD", "are classified under subheading"),
+    ("replace", "CCOMM", "are classified under commodity"),
+
+    ("sub", "(classified under chapter) ([0-9]{2})/([0-9]{2})/([0-9]{2})/([0-9]{2})", "\\1 \\2, chapter \\3, chapter \\4 or chapter \\5"),
+    ("sub", "(classified under chapter) ([0-9]{2})/([0-9]{2})/([0-9]{2})", "\\1 \\2, chapter \\3 or chapter \\4"),
+    ("sub", "(classified under chapter) ([0-9]{2})/([0-9]{2})", "\\1 \\2 or chapter \\3"),
+
+    ("replace", "PRECISE", "The full commodity code"),
+    ("replace", "TOO GENERIC", "The search term entered is too generic. Please enter the specific type of goods."),
+    ("replace", "NOT PHYSICAL", "The search term entered is not a physical item"),
+    ("replace", "NOT REQUIRED", "A commodity code is not required for this item"),
+    ("sub", "heading([^ ])", "heading \\1"),
+]
+
+FINAL_MESSAGE_TIDY = [
+    ("replace", "..", "."),
+    ("sub", "\\s+", " "),
+    ("replace_unless", "http", "/", " / "),
+    ("replace", "to heading", "under heading"),
+    ("replace", "to subheading", "under subheading"),
+    ("replace", "to commodity", "under commodity"),
+    ("replace", "heading commodity", "commodity"),
+    ("replace", ", then", " then"),
+    ("replace", "then, dependent", ", then the full commodity code is dependent"),
+    ("replace", " if of ", " if the item is of "),
+    ("replace", " if a ", " if the item is a "),
+    ("replace", " if an ", " if the item is an "),
+    ("replace", " then The ", " then the "),
+    ("replace", "dependent on what it's used for", "dependent on what the item is used for"),
+
+    ("replace", " ,", ","),
+    ("replace", ",", ", "),
+    ("replace", " .", "."),
+    ("replace", ",.", "."),
+    ("replace", "?.", "?"),
+
+    ("sub", "([0-9])or ", "\\1, or "),
+    ("replace", ", or ", " or "),
+    ("sub", "([0-9]) then", "\\1, then"),
+    ("sub", "([^,]) as long as", "\\1, as long as"),
+    ("sub", "([0-9]) dependent", "\\1, dependent"),
+    ("replace", "is dependent if", "depends whether"),
+    ("replace", "is dependent on", "depends on"),
+    ("replace", "are dependent on", "depend on"),
+    ("replace", "dependent on", "depending on"),
+
+    ("sub", "([^,]) then ", "\\1, then "),
+    ("replace", ", , ", ", "),
+    ("sub", "\\s+", " "),
+]
+
+
+class RewriteRules(object):
+    # The shorthand codes are all upper case, so a capitalised term can only take part in
+    # a match where its placeholder touches an upper case letter. In that case, or where
+    # the term itself has upper case pairs, the block is rerun one rule at a time
+    placeholder_clash = re.compile("[A-Z\x01\x02][\x01\x02]|[\x01\x02][A-Z]")
+    upper_case_pair = re.compile("[A-Z]{2}")
+
+    def __init__(self, name, rules):
+        self.name = name
+        self.rules = rules
+        self.patterns = [re.compile(rule[1]) if rule[0] == "sub" else None for rule in rules]
+        self.steps = []
+        self.compile_steps()
+
+    def compile_steps(self):
+        block = []
+        for index, rule in enumerate(self.rules):
+            if rule[0] == "replace":
+                block.append((rule[1], rule[2]))
+                continue
+            self.close_block(block)
+            block = []
+            if rule[0] == "sub":
+                self.steps.append(("sub", self.patterns[index], rule[2]))
+            else:
+                self.steps.append(rule)
+        self.close_block(block)
+
+    def close_block(self, block):
+        if not block:
+            return
+        if any(TERM in term_to or TERMS in term_to for term_from, term_to in block):
+            self.steps.append(("replace_with_terms", ReplacementPasses(block), block))
+        else:
+            self.steps.append(("replace", ReplacementPasses(block)))
+
+    def apply(self, s, term="", term_pluralised="", profile=None):
+        if profile is not None:
+            return self.apply_profiled(s, term, term_pluralised, profile)
+        for step in self.steps:
+            kind = step[0]
+            if kind == "replace":
+                s = step[1].apply(s)
+            elif kind == "sub":
+                s = step[1].sub(step[2], s)
+            elif kind == "replace_unless":
+                if step[1] not in s:
+                    s = s.replace(step[2], step[3])
+            elif kind == "replace_with_terms":
+                s = self.replace_with_terms(s, step[1], step[2], term, term_pluralised)
+        return s
+
+    def apply_profiled(self, s, term, term_pluralised, profile):
+        # Applies the rules one at a time, in the same way as the fallback for blocks
+        for index, rule in enumerate(self.rules):
+            key = (self.name, index)
+            if rule[0] == "replace":
+                s = rule_profile.replace(profile, key, s, rule[1], rule[2].replace(TERM, term).replace(TERMS, term_pluralised))
+            elif rule[0] == "sub":
+                s = rule_profile.sub(profile, key, self.patterns[index], rule[2], s)
+            elif rule[0] == "replace_unless":
+                if rule[1] not in s:
+                    s = rule_profile.replace(profile, key, s, rule[2], rule[3])
+        return s
+
+    def describe(self):
+        return [list(rule) for rule in self.rules]
+
+    def replace_with_terms(self, s, passes, block, term, term_pluralised):
+        terms = term + " " + term_pluralised
+        if not self.contains_placeholder(s + terms) and not self.upper_case_pair.search(terms):
+            replaced = passes.apply(s)
+            if not self.placeholder_clash.search(replaced):
+                return replaced.replace(TERM, term).replace(TERMS, term_pluralised)
+
+        for term_from, term_to in block:
+            s = s.replace(term_from, term_to.replace(TERM, term).replace(TERMS, term_pluralised))
+        return s
+
+    def contains_placeholder(self, s):
+        return TERM in s or TERMS in s
+
+
+standardise_shorthand_rules = RewriteRules("standardise_shorthand", STANDARDISE_SHORTHAND)
+final_message_tidy_rules = RewriteRules("final_message_tidy", FINAL_MESSAGE_TIDY)
@@ -0,0 +1,66 @@
+import time
+
+
+class RuleProfile(object):
+    # Totals for each rule, added up from the counts that each message records while it
+    # is formatted. Rules are identified by their rule set and their position in it.
+    # Messages that share a formatted result with another term count the matches and
+    # replacements again, but only the time actually spent is counted
+    def __init__(self):
+        self.totals = {}
+
+    def add_message(self, intercept_message):
+        # Messages read from the cache were not formatted in this run, so have no counts
+        if intercept_message.rule_profile is None:
+            return
+        for key, (replacements, seconds) in intercept_message.rule_profile.items():
+            messages, total_replacements, total_seconds = self.totals.get(key, (0, 0, 0.0))
+            self.totals[key] = (messages + (1 if replacements > 0 else 0), total_replacements + replacements, total_seconds + seconds)
+
+    def merge(self, totals):
+        # Adds the totals of another profile, e.g. of another source in a batch
+        for key, (messages, replacements, seconds) in totals.items():
+            total_messages, total_replacements, total_seconds = self.totals.get(key, (0, 0, 0.0))
+            self.totals[key] = (total_messages + messages, total_replacements + replacements, total_seconds + seconds)
+
+    def as_dict(self, rule_sets, slowest_count=20):
+        report = {"rule_sets": {}, "unused_rule_count": 0}
+        rules = []
+        for rule_set, descriptions in rule_sets.items():
+            report["rule_sets"][rule_set] = []
+            for index, description in enumerate(descriptions):
+                messages, replacements, seconds = self.totals.get((rule_set, index), (0, 0, 0.0))
+                rule = {
+                    "index": index,
+                    "rule": description,
+                    "messages": messages,
+                    "replacements": replacements,
+                    "seconds": round(seconds, 6)
+                }
+                report["rule_sets"][rule_set].append(rule)
+                rules.append(dict(rule, rule_set=rule_set))
+                if messages == 0:
+                    report["unused_rule_count"] += 1
+        report["slowest_rules"] = sorted(rules, key=lambda x: x["seconds"], reverse=True)[:slowest_count]
+        return report
+
+
+def record(profile, key, replacements, seconds):
+    previous_replacements, previous_seconds = profile.get(key, (0, 0.0))
+    profile[key] = (previous_replacements + replacements, previous_seconds + seconds)
+
+
+def replace(profile, key, s, term_from, term_to):
+    start = time.perf_counter()
+    replacements = s.count(term_from)
+    if replacements > 0:
+        s = s.replace(term_from, term_to)
+    record(profile, key, replacements, time.perf_counter() - start)
+    return s
+
+
+def sub(profile, key, pattern, to_replace, s):
+    start = time.perf_counter()
+    s, replacements = pattern.subn(to_replace, s)
+    record(profile, key, replacements, time.perf_counter() - start)
+    return s
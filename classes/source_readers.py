@@ -0,0 +1,64 @@
+import csv
+import os
+
+# The columns read from each row: term, total events, message, status and genuine term
+COLUMN_COUNT = 9
+
+
+class XlsxReader(object):
+    def __init__(self, file_path, sheet_name, streaming=False):
+        self.file_path = file_path
+        self.sheet_name = sheet_name
+        self.streaming = streaming
+
+    def iter_rows(self):
+        import openpyxl
+        workbook = openpyxl.load_workbook(self.file_path, read_only=self.streaming)
+        sheet = workbook[self.sheet_name]
+        # In read only mode, sheets without a stored dimension do not pad trailing empty
+        # cells, so short rows are padded as in the delimited reader
+        for row in sheet.iter_rows(values_only=True):
+            yield pad_row(row)
+
+        if self.streaming:
+            workbook.close()
+
+
+class DelimitedReader(object):
+    # Reads a CSV or TSV export a row at a time. Empty cells are given as None and short
+    # rows are padded, so that the rows match those of the xlsx reader
+    def __init__(self, file_path, delimiter=","):
+        self.file_path = file_path
+        self.delimiter = delimiter
+
+    def iter_rows(self):
+        with open(self.file_path, newline="", encoding="utf-8-sig") as f:
+            for row in csv.reader(f, delimiter=self.delimiter):
+                yield pad_row(value if value != "" else None for value in row)
+
+
+def pad_row(row):
+    row = tuple(row)
+    if len(row) < COLUMN_COUNT:
+        row += (None,) * (COLUMN_COUNT - len(row))
+    return row
+
+
+def parse_count(value):
+    # Counts in a CSV export can be written as text, e.g. "1,234" or "12.0", so anything
+    # that is not a number is counted as 0
+    try:
+        return int(float(str(value).replace(",", "")))
+    except (ValueError, OverflowError):
+        return 0
+
+
+def get_source_reader(file_path, sheet_name, streaming=False):
+    # The reader is chosen from the extension of the source file
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == ".csv":
+        return DelimitedReader(file_path, ",")
+    elif extension in (".tsv", ".tab"):
+        return DelimitedReader(file_path, "\t")
+    else:
+        return XlsxReader(file_path, sheet_name, streaming)
@@ -0,0 +1,131 @@
+import collections
+import re
+
+
+class SpellingSuggester(object):
+    # Suggests corrections using a symmetric delete index: every word in the vocabulary is
+    # indexed under the strings formed by deleting up to max_distance characters from it, so
+    # that a lookup only has to generate the deletes of the word being checked. A suggester
+    # can be laid over a base vocabulary, which it reads but never changes
+    def __init__(self, max_distance=2, prefix_length=7, min_word_length=4, cache_size=10000, base=None):
+        self.base = base
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.min_word_length = min_word_length
+        self.cache_size = cache_size
+        self.words = {}
+        self.deletes = {}
+        self.cache = collections.OrderedDict()
+        self.pluralizer = None
+
+    def overlay(self):
+        # A suggester for the words of one source, which shares this vocabulary
+        return SpellingSuggester(self.max_distance, self.prefix_length, self.min_word_length, self.cache_size, self)
+
+    def add_text(self, text):
+        for word in re.findall("[a-z]+", text.lower()):
+            self.add_word(word)
+
+    def add_word(self, word):
+        if word in self.words or (self.base is not None and word in self.base.words):
+            self.words[word] = self.words.get(word, 0) + 1
+            return
+        self.words[word] = 1
+        for delete in self.get_deletes(word[:self.prefix_length]):
+            self.deletes.setdefault(delete, []).append(word)
+        # The vocabulary is built before any word is checked, so the cache is normally
+        # empty here
+        if self.cache:
+            self.cache.clear()
+
+    def get_deletes(self, word):
+        deletes = {word}
+        edits = {word}
+        for distance in range(0, self.max_distance):
+            next_edits = set()
+            for edit in edits:
+                if len(edit) > 1:
+                    for i in range(0, len(edit)):
+                        next_edits.add(edit[:i] + edit[i + 1:])
+            deletes |= next_edits
+            edits = next_edits
+        return deletes
+
+    def suggest(self, word):
+        # Returns the closest, most frequent vocabulary word, or None if the word is known,
+        # too short to check or has no close match
+        if word in self.cache:
+            self.cache.move_to_end(word)
+            return self.cache[word]
+
+        suggestion = self.lookup(word)
+        self.cache[word] = suggestion
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return suggestion
+
+    def is_known(self, word):
+        return word in self.words or (self.base is not None and word in self.base.words)
+
+    def get_count(self, word):
+        return self.words.get(word, 0) + (self.base.words.get(word, 0) if self.base is not None else 0)
+
+    def get_candidates(self, delete):
+        candidates = self.deletes.get(delete, [])
+        if self.base is not None:
+            candidates = candidates + self.base.deletes.get(delete, [])
+        return candidates
+
+    def lookup(self, word):
+        if self.is_known(word) or len(word) < self.min_word_length:
+            return None
+        # The vocabulary is mostly made up of plurals, so singular words are also accepted
+        if self.pluralizer is None:
+            from pluralizer import Pluralizer
+            self.pluralizer = Pluralizer()
+        if self.is_known(self.pluralizer.plural(word)):
+            return None
+
+        # Short words are only allowed a single edit, as they are close to many other words
+        max_distance = self.max_distance if len(word) > 5 else 1
+        best = None
+        candidates = set()
+        for delete in self.get_deletes(word[:self.prefix_length]):
+            candidates.update(self.get_candidates(delete))
+        for candidate in candidates:
+            if abs(len(candidate) - len(word)) > max_distance:
+                continue
+            distance = self.get_distance(word, candidate)
+            if distance <= max_distance:
+                key = (distance, -self.get_count(candidate), candidate)
+                if best is None or key < best:
+                    best = key
+
+        return best[2] if best is not None else None
+
+    def suggest_term(self, term):
+        # Returns the term with each misspelt word corrected, or None if no word needs correcting
+        words = term.split(" ")
+        corrected = False
+        for i in range(0, len(words)):
+            if words[i].isalpha():
+                suggestion = self.suggest(words[i])
+                if suggestion is not None:
+                    words[i] = suggestion
+                    corrected = True
+        return " ".join(words) if corrected else None
+
+    def get_distance(self, a, b):
+        # Optimal string alignment distance, so that a transposition counts as one edit
+        previous_row = None
+        two_rows_back = None
+        row = list(range(0, len(b) + 1))
+        for i in range(1, len(a) + 1):
+            previous_row, row = row, [i] + [0] * len(b)
+            for j in range(1, len(b) + 1):
+                cost = 0 if a[i - 1] == b[j - 1] else 1
+                row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+                if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                    row[j] = min(row[j], two_rows_back[j - 2] + 1)
+            two_rows_back = previous_row
+        return row[len(b)]
@@ -0,0 +1,138 @@
+import csv
+import json
+import os
+import random
+import openpyxl
+
+
+class SyntheticData(object):
+    words = [
+        "apple", "bolt", "bottle", "box", "chair", "cotton shirt", "face paint", "glass", "horse", "lamp",
+        "aerosol can", "safety footwear", "toy car", "widget", "bicycle", "battery", "cable", "candle",
+        "ceramic tile", "coffee", "drone", "engine part", "fishing rod", "guitar", "helmet", "jacket",
+        "kettle", "laptop", "mirror", "notebook", "olive oil", "paint brush", "quilt", "rope", "saddle",
+        "tent", "umbrella", "vase", "wallet", "yoga mat"
+    ]
+    typos = [
+        ("teh", "the"), ("clasified", "classified"), ("dependant", "dependent"), ("hte", "the"),
+        ("mateiral", "material"), ("Woudl", "Would"), ("wich", "which"), ("depedent", "dependent"),
+        ("heaidng", "heading"), ("commodites", "commodities"), ("materail", "material"), ("plasitc", "plastic")
+    ]
+    countries = ["France", "New Zealand", "Germany", "Japan", "Narnia"]
+
+    def __init__(self, folder, rows, headings=1000, typos=100, seed=1):
+        self.folder = folder
+        self.rows = rows
+        self.headings = headings
+        self.typo_count = typos
+        self.random = random.Random(seed)
+        self.codes = []
+        self.resource_path = os.path.join(self.folder, "resources")
+        self.codes_file = os.path.join(self.folder, "codes.csv")
+
+    def generate(self):
+        for sub_folder in ["source", "yml", "excel", "config", "log"]:
+            os.makedirs(os.path.join(self.resource_path, sub_folder), exist_ok=True)
+        self.write_codes()
+        self.write_typos()
+        self.write_country_failures()
+        self.write_source()
+
+    def get_environment(self):
+        return {
+            "SORT_RESULTS": "1",
+            "STATUSES_TO_INCLUDE": "ready",
+            "SOURCE_FILE": "zero_results.xlsx",
+            "SHEET_NAME": "Zero results",
+            "YAML_FILE": "intercept_messages.yml",
+            "YAML_FILE_TEMP": os.path.join(self.resource_path, "yml", "intercept_messages_prototype.yml"),
+            "EXCEL_OUTPUT": "intercept_messages_{date}.xlsx",
+            "TYPOS_FILE": "typos.csv",
+            "CODES_FILE": self.codes_file
+        }
+
+    def write_codes(self):
+        with open(self.codes_file, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["sid", "commodity_code", "productline_suffix", "start_date", "end_date", "indent", "end_line", "description", "class"])
+            for i in range(0, self.headings):
+                heading = "%02d%02d" % (1 + (i // 99) % 97, 1 + i % 99)
+                writer.writerow([i, heading + "000000", "80", "", "", 0, 0, self.description(), "heading"])
+                self.codes.append(heading + "000000")
+                for j in range(1, 4):
+                    subheading = heading + "%02d" % (j * 10)
+                    entity = "subheading" if j < 3 else "commodity"
+                    writer.writerow([i, subheading + "0000", "80", "", "", 1, 0, self.description(), entity])
+                    self.codes.append(subheading + "0000")
+                    if j < 3:
+                        for k in range(1, 3):
+                            commodity = subheading + "%02d00" % (k * 10)
+                            writer.writerow([i, commodity, "80", "", "", 2, 1, self.description(), "commodity"])
+                            self.codes.append(commodity)
+
+    def description(self):
+        words = self.random.sample(self.words, 3)
+        return "Of " + words[0] + "s, " + words[1] + "s or " + words[2] + "s"
+
+    def write_typos(self):
+        typos = list(self.typos)
+        while len(typos) < self.typo_count:
+            word = self.random.choice(self.words).split(" ")[0]
+            position = self.random.randint(0, len(word) - 2)
+            misspelling = word[:position] + word[position + 1] + word[position] + word[position + 2:]
+            if misspelling != word:
+                typos.append((" " + misspelling + " ", " " + word + " "))
+        with open(os.path.join(self.resource_path, "config", "typos.csv"), "w", newline="") as f:
+            writer = csv.writer(f, quotechar='"')
+            writer.writerows(typos[:self.typo_count])
+
+    def write_country_failures(self):
+        with open(os.path.join(self.resource_path, "config", "country_failures.json"), "w") as f:
+            json.dump(["Narnia"], f)
+
+    def write_source(self):
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Zero results")
+        sheet.append(["Search term", "Total events", "Total unique events", "Events per session", "Owner", "Notes", "Message", "Status", "Genuine term"])
+        for i in range(0, self.rows):
+            term, message = self.get_row()
+            genuine_term = None
+            if self.random.random() < 0.3:
+                genuine_term = ", ".join(self.random.sample(self.words, self.random.randint(1, 4)))
+            status = self.random.choice(["Ready", "ready", "ready", "ready", "In progress"])
+            sheet.append([term, self.random.randint(1, 500), None, None, None, None, message, status, genuine_term])
+        workbook.save(os.path.join(self.resource_path, "source", "zero_results.xlsx"))
+
+    def get_row(self):
+        term = self.random.choice(self.words)
+        # Include a small share of misspelt terms, to exercise the spelling suggestions
+        if self.random.random() < 0.05:
+            position = self.random.randint(0, len(term) - 2)
+            term = term[:position] + term[position + 1] + term[position] + term[position + 2:]
+        if self.random.random() < 0.6:
+            term += " " + str(self.random.randint(1, 10 * self.rows))
+        templates = [
+            lambda: "TERM CHEAD {0}".format(self.code(4)),
+            lambda: "TERMS CLASS heading {0}/{1}/{2}".format(self.code(4), self.code(4), self.code(4)),
+            lambda: "TERM CSHEAD {0}, then dependant on teh mateiral".format(self.code(6)),
+            lambda: "{0} | For use in the kitchen".format(self.code(self.random.choice([4, 6, 8, 10]))),
+            lambda: "TOO GENERIC",
+            lambda: "NOT PHYSICAL",
+            lambda: "NOT REQUIRED",
+            lambda: "CCHAP {0}/{1}".format(self.code(2), self.code(2)),
+            lambda: "TERM CCOMM {0} if of plastic, or {1} if a metal".format(self.code(10), self.code(10)),
+            lambda: "PRECISE is dependent on what it's used for. heading {0}, {1}".format(self.code(4), self.code(4)),
+            lambda: "Chapter {0} Woudl depend on the material, ATAR".format(self.code(2)),
+            lambda: "TERM CLASS {0}/{1}\nor {2}, wich depends on size".format(self.code(4), self.code(4), self.code(10)),
+            lambda: "TERM CHEAD {0} as long as it is not to subheading {1}".format(self.code(4), self.code(6))
+        ]
+        if self.random.random() < 0.03:
+            return self.random.choice(self.countries), "COUNTRY"
+        return term, self.random.choice(templates)()
+
+    def code(self, length):
+        code = self.random.choice(self.codes)
+        # Include a small share of codes that do not exist, to exercise the diagnostics
+        if self.random.random() < 0.05:
+            code = "%010d" % self.random.randint(0, 10 ** 10 - 1)
+        return code[:length]
@@ -0,0 +1,85 @@
+import functools
+import heapq
+import time
+
+
+class Timings(object):
+    def __init__(self, slowest_count=10):
+        self.slowest_count = slowest_count
+        self.phases = {}
+        self.steps = {}
+        self.slowest_messages = []
+        self.message_index = 0
+
+    def add(self, totals, name, seconds):
+        if name not in totals:
+            totals[name] = {"seconds": 0.0, "calls": 0}
+        totals[name]["seconds"] += seconds
+        totals[name]["calls"] += 1
+
+    def add_phase(self, name, seconds):
+        self.add(self.phases, name, seconds)
+
+    def add_message(self, intercept_message):
+        # Messages read from the cache were not formatted in this run, so have no timings
+        if intercept_message.timings is None:
+            return
+        total = 0.0
+        for step, seconds in intercept_message.timings.items():
+            self.add(self.steps, step, seconds)
+            total += seconds
+
+        # Keeps the slowest messages in a min-heap, with the index as a tie-break
+        self.message_index += 1
+        entry = (total, self.message_index, intercept_message.term, intercept_message.timings)
+        if len(self.slowest_messages) < self.slowest_count:
+            heapq.heappush(self.slowest_messages, entry)
+        elif self.slowest_count > 0:
+            heapq.heappushpop(self.slowest_messages, entry)
+
+    def timed_iter(self, name, iterable):
+        # Records the time spent producing the items of an iterable, excluding the time
+        # the consumer spends on each item
+        iterator = iter(iterable)
+        seconds = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - start
+                yield item
+        finally:
+            self.add_phase(name, seconds)
+
+    def as_dict(self):
+        slowest_messages = []
+        for total, index, term, timings in sorted(self.slowest_messages, reverse=True):
+            slowest_messages.append({
+                "term": term,
+                "seconds": round(total, 6),
+                "steps": {step: round(seconds, 6) for step, seconds in timings.items()}
+            })
+        return {
+            "phases": self.round_totals(self.phases),
+            "steps": self.round_totals(self.steps),
+            "slowest_messages": slowest_messages
+        }
+
+    def round_totals(self, totals):
+        return {name: {"seconds": round(total["seconds"], 4), "calls": total["calls"]} for name, total in totals.items()}
+
+
+def timed_phase(function):
+    # Records the duration of an Excel method in its timings
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(self, *args, **kwargs)
+        finally:
+            self.timings.add_phase(function.__name__, time.perf_counter() - start)
+    return wrapper
@@ -0,0 +1,32 @@
+import csv
+from classes.replacement_passes import ReplacementPasses
+from classes import rule_profile
+
+
+class TypoCorrector(object):
+    def __init__(self, typos_file_path):
+        self.typos_file_path = typos_file_path
+        self.rules = []
+        self.load_rules()
+        self.passes = ReplacementPasses(self.rules)
+
+    def load_rules(self):
+        with open(self.typos_file_path, 'r') as file:
+            reader = csv.reader(file, quotechar='"')
+            for row in reader:
+                if len(row) < 2 or row[0] == "":
+                    continue
+                term_from = row[0]
+                term_to = row[1]
+                self.rules.append((term_from, term_to))
+
+        print(f'{len(self.rules)} typo corrections have been read.')
+
+    def correct(self, s, profile=None):
+        # When profiling, the rules are applied one at a time, which gives the same result
+        # as the combined passes but shows what each rule does
+        if profile is not None:
+            for index, (term_from, term_to) in enumerate(self.rules):
+                s = rule_profile.replace(profile, ("typos", index), s, term_from, term_to)
+            return s
+        return self.passes.apply(s)
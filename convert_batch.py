@@ -0,0 +1,13 @@
+import argparse
+import os
+from classes.batch import Batch
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert several zero results workbooks and sheets in one run")
+    parser.add_argument("--manifest", default=os.path.join(os.getcwd(), "resources", "config", "batch.json"), help="JSON file listing the sources to convert")
+    parser.add_argument("--workers", type=int, help="number of sources converted at once")
+    args = parser.parse_args()
+
+    batch = Batch(args.manifest, args.workers)
+    batch.run()
@@ -1,8 +1,6 @@
 from classes.excel import Excel
 
-excel = Excel()
-excel.read()
-excel.write_yaml()
-excel.write_yaml_for_prototype()
-excel.write_excel()
-excel.write_erroneous_digits()
+
+if __name__ == "__main__":
+    excel = Excel()
+    excel.convert()
@@ -0,0 +1,12 @@
+import argparse
+from classes.preview import Preview
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the conversion running, refreshing the outputs when the source, typos or codes change")
+    parser.add_argument("--port", type=int, default=8001, help="port of the local formatting endpoint")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between checks for changed files")
+    args = parser.parse_args()
+
+    preview = Preview(args.port, args.interval)
+    preview.run()
@@ -1,6 +1,9 @@
-from textblob import Word
+import sys
+from classes.excel import Excel
 
 
-word = Word('appple')
-result = word.spellcheck()
-print(result)
+if __name__ == "__main__":
+    # Suggests corrections for the words given, e.g. python3 spl.py appple
+    excel = Excel()
+    for word in sys.argv[1:]:
+        print(word, excel.spelling_suggester.suggest_term(word.lower()))